@@ -11,20 +11,76 @@ Wenn alle Bedingungen erfüllt sind:
 - Konvertiert die Bilder mit dbv_autoimgcov.py (fügt Namen hinzu)
 - Speichert als _1_auto.jpg, _2_auto.jpg, _3_auto.jpg
 - Aktualisiert die Datenbank mit den final_picture Pfaden
+
+Mit --workers N werden die Einträge auf N Prozesse verteilt. Die Ergebnisse
+werden im Hauptprozess gesammelt und am Ende in einer Transaktion gespeichert.
+
+Zu jedem erzeugten _auto-Bild wird im Render-Manifest (Tabelle render_manifest)
+festgehalten, aus welchem Quellbild (Größe, Änderungszeit, SHA-256), mit welchem
+Namen und welchen Renderer-Parametern es entstanden ist. Mit --refresh werden
+alle Einträge geprüft und nur Bilder neu gerendert, deren Eingaben sich geändert haben.
+
+Mit --watch läuft das Skript dauerhaft: Es beobachtet die work_path-Verzeichnisse
+(Änderungszeit des Verzeichnisses, danach ein scandir), rendert einen Eintrag, sobald
+seine drei Bilder vollständig und seit --debounce Sekunden unverändert sind, und
+schreibt Warteschlange und Durchsatz in eine Statusdatei (JSON).
 """
 
 import os
 import sqlite3
 import sys
+import time
+import re
+import json
+import signal
 import argparse
+import datetime
+import collections
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # Importiere die Konvertierungsfunktion
-from dbv_autoimgcov import execute_autoconvert
+from dbv_autoimgcov import (execute_autoconvert, warm_font_cache, get_render_params, get_encoder_dest_path,
+                            RENDER_PROFILES, DEFAULT_PROFILE, ENCODER_PROFILES, DEFAULT_ENCODER)
+from dbv_copyengine import file_hash
+from dbv_memprofile import (StageProfiler, get_rss, get_peak_rss, format_bytes,
+                            summarize_stages, format_stage_report)
 
 # Datenbankpfad (relativ zum Skript-Verzeichnis)
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "anmeldungen.db")
 
+# Bereits gerenderte Bilder (…auto_1.jpg usw.) sind keine Quellbilder
+AUTO_IMAGE_PATTERN = re.compile(r'auto_[123]$')
+
+# Unterstützte Bildformate (Quellbilder bzw. mit .webp auch erzeugte _auto-Bilder)
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.gif'}
+AUTO_EXTENSIONS = IMAGE_EXTENSIONS | {'.webp'}
+
+# Threads für das Einlesen der work_path-Verzeichnisse (I/O-gebunden, v.a. auf dem NAS)
+SCAN_WORKERS = 16
+
+# Beobachtungsmodus (--watch)
+WATCH_INTERVAL = 10        # Sekunden zwischen zwei Prüfungen
+WATCH_DEBOUNCE = 30        # Sekunden, die ein vollständiger Bildersatz unverändert sein muss
+THROUGHPUT_WINDOW = 600    # Zeitraum (s) für den Durchsatz in der Statusdatei
+STATUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "autoallpics_status.json")
+
+# Render-Manifest: Herkunft jedes erzeugten _auto-Bildes
+RENDER_MANIFEST_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS render_manifest (
+        output_path TEXT PRIMARY KEY,
+        entry_id INTEGER NOT NULL,
+        source_path TEXT NOT NULL,
+        source_size INTEGER,
+        source_mtime_ns INTEGER,
+        source_hash TEXT,
+        name_text TEXT,
+        render_params TEXT,
+        rendered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_render_manifest_entry ON render_manifest(entry_id);
+"""
+
 
 def get_entries_with_work_path():
     """
@@ -50,57 +106,100 @@ def get_entries_with_work_path():
     return entries
 
 
-def get_image_files_in_path(work_path):
+def get_all_entries_with_work_path():
     """
-    Findet die Bilder _1, _2, _3 im angegebenen Pfad.
+    Holt alle Einträge mit work_path, unabhängig von den final_picture-Spalten (für --refresh).
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT id, work_path, final_picture_1, final_picture_2, final_picture_3, vorname, name
+        FROM anmeldungen
+        WHERE work_path IS NOT NULL
+          AND work_path != ''
+    """)
+    
+    entries = cursor.fetchall()
+    conn.close()
+    
+    return entries
+
+
+def index_work_dir(work_path):
+    """
+    Liest ein work_path-Verzeichnis mit einem einzigen os.scandir.
     
     Args:
-        work_path: Der zu prüfende Pfad
+        work_path: Das einzulesende Verzeichnis
         
     Returns:
-        tuple: (pfad_zu_bild_1, pfad_zu_bild_2, pfad_zu_bild_3) oder (None, None, None)
+        dict: {'sources': [bild_1, bild_2, bild_3] (None, wo keins gefunden wurde),
+               'auto': Liste der Bilder mit 'auto' im Namen}
+              oder None, wenn das Verzeichnis nicht existiert oder nicht lesbar ist
     """
-    # Unterstützte Bildformate
-    image_extensions = {'.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.gif'}
+    sources = [None, None, None]
+    auto_files = []
+    try:
+        with os.scandir(work_path) as it:
+            for dir_entry in it:
+                # Nur Dateien (keine Verzeichnisse); nutzt den Typ aus dem Verzeichniseintrag
+                if not dir_entry.is_file():
+                    continue
+                
+                name_without_ext, ext = os.path.splitext(dir_entry.name.lower())
+                if 'auto' in name_without_ext and ext in AUTO_EXTENSIONS:
+                    auto_files.append(dir_entry.path)
+                
+                # Prüfe auf _1, _2, _3 vor der Dateiendung
+                if ext not in IMAGE_EXTENSIONS or AUTO_IMAGE_PATTERN.search(name_without_ext):
+                    continue
+                if name_without_ext[-2:] in ('_1', '_2', '_3'):
+                    sources[int(name_without_ext[-1]) - 1] = dir_entry.path
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        print(f"Fehler beim Durchsuchen von {work_path}: {e}", file=sys.stderr)
+        return None
     
-    # Prüfe, ob der Pfad existiert
-    if not os.path.isdir(work_path):
-        return None, None, None
+    return {'sources': sources, 'auto': auto_files}
+
+
+def scan_work_dirs(work_paths, workers=SCAN_WORKERS):
+    """
+    Liest alle work_path-Verzeichnisse parallel ein (ein scandir pro Verzeichnis).
     
-    # Suche nach Bildern mit den Endungen _1, _2, _3
-    img_1 = None
-    img_2 = None
-    img_3 = None
+    Returns:
+        dict: Verzeichnis -> Ergebnis von index_work_dir
+    """
+    work_paths = list(dict.fromkeys(work_paths))
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return dict(zip(work_paths, executor.map(index_work_dir, work_paths)))
+
+
+def get_image_files_in_path(work_path, dir_index=None):
+    """
+    Findet die Bilder _1, _2, _3 im angegebenen Pfad.
     
-    try:
-        for file in os.listdir(work_path):
-            file_lower = file.lower()
-            file_path = os.path.join(work_path, file)
-            
-            # Nur Dateien (keine Verzeichnisse)
-            if not os.path.isfile(file_path):
-                continue
-            
-            # Prüfe, ob es ein Bild ist
-            ext = os.path.splitext(file_lower)[1]
-            if ext not in image_extensions:
-                continue
-            
-            # Prüfe auf _1, _2, _3 vor der Dateiendung
-            name_without_ext = os.path.splitext(file_lower)[0]
-            if name_without_ext.endswith('_1'):
-                img_1 = file_path
-            elif name_without_ext.endswith('_2'):
-                img_2 = file_path
-            elif name_without_ext.endswith('_3'):
-                img_3 = file_path
-    except Exception as e:
-        print(f"Fehler beim Durchsuchen von {work_path}: {e}", file=sys.stderr)
+    Args:
+        work_path: Der zu prüfende Pfad
+        dir_index: Bereits eingelesenes Verzeichnis (aus scan_work_dirs), sonst wird es gelesen
+        
+    Returns:
+        tuple: (pfad_zu_bild_1, pfad_zu_bild_2, pfad_zu_bild_3) oder (None, None, None)
+    """
+    if dir_index is None:
+        dir_index = index_work_dir(work_path)
+    if dir_index is None or not all(dir_index['sources']):
         return None, None, None
-    
-    if img_1 and img_2 and img_3:
-        return img_1, img_2, img_3
-    return None, None, None
+    return tuple(dir_index['sources'])
+
+
+def resolve_work_path(work_path, base_dir):
+    """Relativer work_path -> absoluter, normalisierter Pfad"""
+    if not os.path.isabs(work_path):
+        work_path = os.path.join(base_dir, work_path)
+    return os.path.normpath(work_path)
 
 
 def check_images_in_path(work_path):
@@ -125,64 +224,483 @@ def update_database_final_pictures(entry_id, final_paths):
         entry_id: ID des Eintrags
         final_paths: Liste mit 3 Pfaden für final_picture_1, _2, _3
     """
+    update_database_final_pictures_batch([(entry_id, final_paths)])
+
+
+def update_database_final_pictures_batch(updates):
+    """
+    Aktualisiert final_picture Spalten und Status für viele Einträge in einer Transaktion.
+    
+    Args:
+        updates: Liste von (entry_id, [final_picture_1, final_picture_2, final_picture_3])
+    """
+    save_render_results(updates, [])
+
+
+def ensure_render_manifest(conn):
+    """Legt die Tabelle render_manifest an, falls sie noch nicht existiert."""
+    conn.executescript(RENDER_MANIFEST_SCHEMA)
+
+
+def load_render_manifest():
+    """
+    Liest das Render-Manifest.
+    
+    Returns:
+        dict: output_path -> Zeile (sqlite3.Row)
+    """
     conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    conn.row_factory = sqlite3.Row
+    ensure_render_manifest(conn)
+    rows = conn.execute("SELECT * FROM render_manifest").fetchall()
+    conn.close()
+    return {row['output_path']: row for row in rows}
+
+
+def save_render_results(updates, manifest_rows):
+    """
+    Speichert final_picture-Pfade und Manifest-Einträge in einer gemeinsamen Transaktion.
     
-    cursor.execute("""
-        UPDATE anmeldungen
-        SET final_picture_1 = ?,
-            final_picture_2 = ?,
-            final_picture_3 = ?,
-            status = 'Erledigt'
-        WHERE id = ?
-    """, (final_paths[0], final_paths[1], final_paths[2], entry_id))
-    
-    conn.commit()
+    Args:
+        updates: Liste von (entry_id, [final_picture_1, final_picture_2, final_picture_3])
+        manifest_rows: Liste von (output_path, entry_id, source_path, source_size,
+                       source_mtime_ns, source_hash, name_text, render_params)
+    """
+    if not updates and not manifest_rows:
+        return
+    
+    conn = sqlite3.connect(DB_PATH)
+    ensure_render_manifest(conn)
+    with conn:
+        conn.executemany("""
+            UPDATE anmeldungen
+            SET final_picture_1 = ?,
+                final_picture_2 = ?,
+                final_picture_3 = ?,
+                status = 'Erledigt'
+            WHERE id = ?
+        """, [(paths[0], paths[1], paths[2], entry_id) for entry_id, paths in updates])
+        conn.executemany("""
+            INSERT OR REPLACE INTO render_manifest
+                (output_path, entry_id, source_path, source_size, source_mtime_ns, source_hash, name_text, render_params)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, manifest_rows)
+    conn.close()
+    
+    if updates:
+        print(f"  Datenbank aktualisiert für {len(updates)} Einträge (Status: Erledigt)")
+    if manifest_rows:
+        print(f"  Render-Manifest aktualisiert für {len(manifest_rows)} Bilder")
+
+
+def prune_render_manifest():
+    """
+    Entfernt Manifest-Einträge, deren _auto-Bild nicht mehr existiert.
+    
+    Returns:
+        int: Anzahl der entfernten Einträge
+    """
+    conn = sqlite3.connect(DB_PATH)
+    ensure_render_manifest(conn)
+    missing = [(path,) for (path,) in conn.execute("SELECT output_path FROM render_manifest")
+               if not os.path.isfile(path)]
+    with conn:
+        conn.executemany("DELETE FROM render_manifest WHERE output_path = ?", missing)
     conn.close()
-    print(f"  Datenbank aktualisiert für ID {entry_id} (Status: Erledigt)")
+    return len(missing)
+
+
+def get_refresh_reason(manifest_row, img_path, dest_path, person_name, render_params, existing_outputs=None):
+    """
+    Prüft anhand des Manifests, ob ein _auto-Bild neu gerendert werden muss.
+    
+    Args:
+        existing_outputs: Vorhandene auto-Bilder des Verzeichnisses (aus scan_work_dirs), sonst Dateiprüfung
+    
+    Returns:
+        str: Grund für das erneute Rendern, oder None wenn das Bild aktuell ist
+    """
+    if manifest_row is None:
+        return "nicht im Manifest"
+    if existing_outputs is not None:
+        if dest_path not in existing_outputs:
+            return "Ausgabe fehlt"
+    elif not os.path.isfile(dest_path):
+        return "Ausgabe fehlt"
+    if manifest_row['source_path'] != img_path:
+        return "anderes Quellbild"
+    if manifest_row['name_text'] != person_name:
+        return "Name geändert"
+    if manifest_row['render_params'] != render_params:
+        return "Renderer-Parameter geändert"
+    
+    try:
+        stat = os.stat(img_path)
+    except OSError:
+        return "Quellbild nicht lesbar"
+    if stat.st_size != manifest_row['source_size']:
+        return "Quellbild geändert"
+    if stat.st_mtime_ns != manifest_row['source_mtime_ns']:
+        # Nur der Zeitstempel ist anders (z.B. erneut kopiert) -> Inhalt entscheidet
+        if file_hash(img_path) != manifest_row['source_hash']:
+            return "Quellbild geändert"
+    return None
 
 
-def remove_auto_images_from_path(work_path):
+def get_auto_dest_path(img_path, encoder=None):
+    """
+    Zielpfad des konvertierten Bildes: _auto vor der Nummer, als JPG
+    (bzw. im Format des Encoder-Profils, z.B. .webp).
+    z.B. Ella_Günther_1.png -> Ella_Günther_auto_1.jpg
+    """
+    dir_name = os.path.dirname(img_path)
+    base_name = os.path.splitext(os.path.basename(img_path))[0]
+    dest_base = base_name[:-2] + "auto_" + base_name[-1]  # _1 -> _auto_1
+    return get_encoder_dest_path(os.path.join(dir_name, dest_base + ".jpg"), encoder)
+
+
+def render_entry(entry_id, person_name, image_paths, up_to_date=(), profile=None, encoder=None, mem_profile=False):
+    """
+    Konvertiert die drei Bilder eines Eintrags. Läuft auch in Worker-Prozessen,
+    daher werden die Ausgaben gesammelt und vom Hauptprozess gedruckt.
+    
+    Args:
+        up_to_date: Quellbilder, deren _auto-Bild laut Manifest aktuell ist (werden nicht gerendert)
+        profile: Render-Profil (Schlüssel aus RENDER_PROFILES)
+        encoder: Encoder-Profil (Schlüssel aus ENCODER_PROFILES)
+        mem_profile: Speicher nach jedem Verarbeitungsschritt messen
+    
+    Returns:
+        tuple: (entry_id, Liste der Zielpfade (None bei Fehler), Ausgabezeilen,
+                Liste von (zielpfad, quellpfad, größe, mtime_ns, sha256) der gerenderten Bilder,
+                Speicherdaten {'peak_rss': Spitze des Prozesses, 'stages': Messungen je Bild})
+    """
+    final_paths = []
+    log_lines = []
+    rendered = []
+    stage_lists = []
+    for i, img_path in enumerate(image_paths, 1):
+        dest_path = get_auto_dest_path(img_path, encoder)
+        if img_path in up_to_date:
+            final_paths.append(dest_path)
+            log_lines.append(f"  Bild {i}: {os.path.basename(dest_path)} ist aktuell")
+            continue
+        
+        log_lines.append(f"  Konvertiere Bild {i}: {os.path.basename(img_path)} -> {os.path.basename(dest_path)}")
+        
+        # Quelldaten vor dem Rendern festhalten, damit spätere Änderungen erkannt werden
+        try:
+            stat = os.stat(img_path)
+            source_hash = file_hash(img_path)
+        except OSError as e:
+            final_paths.append(None)
+            log_lines.append(f"    ✗ Fehler: {e}")
+            continue
+        
+        profiler = StageProfiler() if mem_profile else None
+        success, message = execute_autoconvert(img_path, dest_path, person_name, profile=profile,
+                                               encoder=encoder, profiler=profiler)
+        if profiler:
+            stage_lists.append(profiler.stages)
+        if success:
+            final_paths.append(dest_path)
+            rendered.append((dest_path, img_path, stat.st_size, stat.st_mtime_ns, source_hash))
+            log_lines.append(f"    ✓ Erfolgreich konvertiert")
+        else:
+            final_paths.append(None)
+            log_lines.append(f"    ✗ Fehler: {message}")
+    return entry_id, final_paths, log_lines, rendered, {'peak_rss': get_peak_rss(), 'stages': stage_lists}
+
+
+def init_worker(profile=None):
+    """Initialisierung der Worker: Strg+C bleibt dem Hauptprozess überlassen, Schriften vorladen."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    warm_font_cache(profile)
+
+
+def get_budget_limit(mem_budget, worker_peak, workers):
+    """
+    Anzahl gleichzeitiger Render-Prozesse, die bei der gemessenen Spitze je Prozess
+    zusammen mit dem Hauptprozess in das Speicherbudget passen (mindestens 1).
+    """
+    if worker_peak <= 0:
+        return workers
+    return max(1, min(workers, int((mem_budget - get_rss()) // worker_peak)))
+
+
+def iter_render_results(jobs, workers, profile=None, mem_profile=False, mem_budget=None):
+    """
+    Rendert die Aufträge (entry_id, person_name, image_paths, up_to_date, profile, encoder) und liefert die Ergebnisse
+    in der Reihenfolge ihrer Fertigstellung.
+    
+    Es sind nie mehr Aufträge unterwegs als Prozesse arbeiten dürfen. Mit workers <= 1 wird
+    im Hauptprozess gerendert und mem_budget nicht verwendet. Mit Speicherbudget
+    (Bytes) startet zunächst ein Auftrag; danach wird die Parallelität aus der gemessenen
+    Speicherspitze je Prozess bestimmt und bei Bedarf gesenkt, statt das System swappen zu lassen.
+    
+    Strg+C wird nur hier behandelt: solange der Generator läuft, setzt SIGINT nur eine
+    Markierung, auch wenn der Aufrufer gerade ein Ergebnis verarbeitet. Danach werden keine
+    Aufträge mehr gestartet, laufende fertig gerendert und alle fertigen Ergebnisse noch
+    geliefert; erst dann wird KeyboardInterrupt ausgelöst. Ein zweites Strg+C wirkt wieder sofort.
+    """
+    interrupted = []
+    
+    def on_sigint(signum, frame):
+        interrupted.append(True)
+        signal.signal(signal.SIGINT, previous_handler)
+        print("\n\nAbbruch (Strg+C): laufende Einträge werden noch fertig gerendert...", flush=True)
+    
+    previous_handler = signal.signal(signal.SIGINT, on_sigint)
+    try:
+        if workers <= 1:
+            warm_font_cache(profile)
+            for job in jobs:
+                if interrupted:
+                    break
+                yield render_entry(*job, mem_profile=mem_profile)
+        else:
+            yield from iter_parallel_results(jobs, workers, profile, mem_profile, mem_budget, interrupted)
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+    if interrupted:
+        raise KeyboardInterrupt
+
+
+def iter_parallel_results(jobs, workers, profile, mem_profile, mem_budget, interrupted):
+    """Teil von iter_render_results für mehrere Render-Prozesse; startet nichts mehr, sobald interrupted gesetzt ist."""
+    pending_jobs = iter(jobs)
+    running = set()
+    limit = 1 if mem_budget else workers
+    worker_peak = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(profile,)) as executor:
+        while True:
+            while len(running) < limit and not interrupted:
+                job = next(pending_jobs, None)
+                if job is None:
+                    break
+                running.add(executor.submit(render_entry, *job, mem_profile=mem_profile))
+            if not running:
+                break
+            
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if mem_budget:
+                    worker_peak = max(worker_peak, result[4]['peak_rss'])
+                    new_limit = get_budget_limit(mem_budget, worker_peak, workers)
+                    if new_limit != limit:
+                        print(f"\r\033[K  Speicherbudget: {new_limit} parallele Render-Prozesse "
+                              f"(Spitze je Prozess {format_bytes(worker_peak)})")
+                        limit = new_limit
+                yield result
+
+
+def format_duration(seconds):
+    """Sekunden als H:MM:SS"""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def print_progress(done, total, start_time):
+    """Fortschrittszeile mit Durchsatz und geschätzter Restzeit (wird überschrieben)."""
+    elapsed = time.monotonic() - start_time
+    rate = done / elapsed if elapsed > 0 else 0
+    eta = (total - done) / rate if rate > 0 else 0
+    print(f"\r  Fortschritt: {done}/{total} ({done * 100 // total}%)  "
+          f"{rate * 60:.1f} Einträge/min  vergangen {format_duration(elapsed)}  ETA {format_duration(eta)}   ",
+          end="", flush=True)
+
+
+def remove_auto_images_from_path(work_path, auto_files=None):
     """
     Löscht alle Bilder im angegebenen Pfad, die 'auto' im Dateinamen haben.
     
     Args:
         work_path: Der zu prüfende Pfad
+        auto_files: Bereits ermittelte auto-Bilder (aus scan_work_dirs), sonst wird das Verzeichnis gelesen
         
     Returns:
         int: Anzahl der gelöschten Dateien
     """
-    # Unterstützte Bildformate
-    image_extensions = {'.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.gif'}
+    if auto_files is None:
+        dir_index = index_work_dir(work_path)
+        if dir_index is None:
+            return 0
+        auto_files = dir_index['auto']
+    
     deleted_count = 0
+    for file_path in auto_files:
+        try:
+            os.remove(file_path)
+            print(f"    Gelöscht: {os.path.basename(file_path)}")
+            deleted_count += 1
+        except OSError as e:
+            print(f"  Fehler beim Löschen in {work_path}: {e}", file=sys.stderr)
+    
+    return deleted_count
+
+
+def write_status_file(path, status):
+    """Schreibt die Statusdatei atomar (erst temporär, dann umbenennen), damit Leser nie halbe Dateien sehen."""
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(status, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Fehler beim Schreiben der Statusdatei {path}: {e}", file=sys.stderr)
+
+
+def get_source_signature(image_paths):
+    """(Größe, Änderungszeit) der Quellbilder; None, wenn eines (noch) fehlt."""
+    try:
+        stats = [os.stat(path) for path in image_paths]
+    except OSError:
+        return None
+    return tuple((stat.st_size, stat.st_mtime_ns) for stat in stats)
+
+
+def watch(args, base_dir):
+    """
+    Beobachtet die work_path-Verzeichnisse der noch nicht konvertierten Einträge und rendert,
+    sobald ein Bildersatz vollständig und seit args.debounce Sekunden unverändert ist.
+    Läuft bis Strg+C; laufende Aufträge werden dann noch fertiggestellt und gespeichert.
+    """
+    render_params = json.dumps(get_render_params(profile=args.profile, encoder=args.encoder), sort_keys=True)
+    workers = max(1, args.workers)
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(args.profile,))
+    
+    # Verzeichnis -> Änderungszeit und Index beim letzten Einlesen
+    dir_snapshots = {}
+    # entry_id -> {'signature', 'changed_at', 'failed_signature'}
+    candidates = {}
+    running = {}            # Future -> entry_id
+    queue = collections.deque()
+    person_names = {}
+    completed_times = collections.deque()
+    totals = {'rendered': 0, 'failed': 0}
+    started_at = datetime.datetime.now().isoformat(timespec='seconds')
+    
+    print(f"Beobachte work_path-Verzeichnisse alle {args.interval} s (Entprellung {args.debounce} s, "
+          f"{workers} Render-Prozess(e)). Status: {args.status_file}. Beenden mit Strg+C.")
+    
+    def collect_results(block):
+        """Fertige Aufträge einsammeln und gemeinsam in einer Transaktion speichern."""
+        if not running:
+            return
+        done, _ = wait(list(running), timeout=None if block else 0)
+        updates = []
+        manifest_rows = []
+        for future in done:
+            entry_id = running.pop(future)
+            try:
+                entry_id, final_paths, log_lines, rendered, _ = future.result()
+            except Exception as e:
+                log_lines, final_paths, rendered = [f"  ✗ Fehler: {e}"], [None], []
+            print(f"Verarbeitet ID {entry_id}:")
+            print("\n".join(log_lines))
+            for dest_path, img_path, size, mtime_ns, source_hash in rendered:
+                manifest_rows.append((dest_path, entry_id, img_path, size, mtime_ns, source_hash,
+                                      person_names[entry_id], render_params))
+            if all(final_paths):
+                updates.append((entry_id, final_paths))
+                totals['rendered'] += 1
+                completed_times.append(time.monotonic())
+                candidates.pop(entry_id, None)
+            else:
+                # Erst nach einer Änderung der Quellbilder erneut versuchen
+                totals['failed'] += 1
+                candidate = candidates.get(entry_id)
+                if candidate:
+                    candidate['failed_signature'] = candidate['signature']
+        save_render_results(updates, manifest_rows)
     
-    # Prüfe, ob der Pfad existiert
-    if not os.path.isdir(work_path):
-        return 0
+    def write_status(watched_dirs):
+        now = time.monotonic()
+        while completed_times and now - completed_times[0] > THROUGHPUT_WINDOW:
+            completed_times.popleft()
+        write_status_file(args.status_file, {
+            'updated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'started_at': started_at,
+            'watched_dirs': watched_dirs,
+            'waiting': sum(1 for c in candidates.values() if c['signature'] and c['signature'] != c['failed_signature']),
+            'queue_depth': len(queue),
+            'running': len(running),
+            'rendered_total': totals['rendered'],
+            'failed_total': totals['failed'],
+            'rendered_per_minute': round(len(completed_times) * 60 / THROUGHPUT_WINDOW, 2),
+        })
     
     try:
-        for file in os.listdir(work_path):
-            file_lower = file.lower()
-            file_path = os.path.join(work_path, file)
+        while True:
+            now = time.monotonic()
+            entries = get_entries_with_work_path()
+            busy_ids = set(running.values()) | {job[0] for job in queue}
+            watched_dirs = set()
             
-            # Nur Dateien (keine Verzeichnisse)
-            if not os.path.isfile(file_path):
-                continue
+            for entry_id, work_path, fp1, fp2, fp3, vorname, name in entries:
+                if entry_id in busy_ids:
+                    continue
+                full_path = resolve_work_path(work_path, base_dir)
+                watched_dirs.add(full_path)
+                
+                # Verzeichnis nur neu einlesen, wenn sich seine Änderungszeit geändert hat
+                try:
+                    dir_mtime = os.stat(full_path).st_mtime_ns
+                except OSError:
+                    continue
+                snapshot = dir_snapshots.get(full_path)
+                if snapshot is None or snapshot[0] != dir_mtime:
+                    snapshot = (dir_mtime, index_work_dir(full_path))
+                    dir_snapshots[full_path] = snapshot
+                
+                image_paths = get_image_files_in_path(full_path, snapshot[1])
+                if not image_paths[0]:
+                    candidates.pop(entry_id, None)
+                    continue
+                
+                # Vollständig: warten, bis Größe und Änderungszeit der Bilder zur Ruhe kommen
+                signature = (image_paths, get_source_signature(image_paths))
+                candidate = candidates.setdefault(entry_id, {'signature': None, 'changed_at': now,
+                                                             'failed_signature': None})
+                if candidate['signature'] != signature:
+                    candidate['signature'] = signature
+                    candidate['changed_at'] = now
+                elif (signature[1] is not None and signature != candidate['failed_signature']
+                      and now - candidate['changed_at'] >= args.debounce):
+                    person_name = f"{vorname} {name}" if vorname and name else (vorname or name or "Unbekannt")
+                    person_names[entry_id] = person_name
+                    queue.append((entry_id, person_name, list(image_paths), (), args.profile, args.encoder))
+                    print(f"ID {entry_id}: Bilder vollständig, zur Konvertierung eingereiht ({person_name})")
             
-            # Prüfe, ob es ein Bild ist
-            ext = os.path.splitext(file_lower)[1]
-            if ext not in image_extensions:
-                continue
+            # Einträge, die nicht mehr offen sind, vergessen
+            open_ids = {entry[0] for entry in entries}
+            for entry_id in list(candidates):
+                if entry_id not in open_ids:
+                    del candidates[entry_id]
+            for full_path in list(dir_snapshots):
+                if full_path not in watched_dirs:
+                    del dir_snapshots[full_path]
+            
+            # Nicht mehr Aufträge vergeben, als Prozesse frei sind
+            while queue and len(running) < workers:
+                job = queue.popleft()
+                running[executor.submit(render_entry, *job)] = job[0]
             
-            # Prüfe, ob 'auto' im Dateinamen ist
-            if 'auto' in file_lower:
-                os.remove(file_path)
-                print(f"    Gelöscht: {file}")
-                deleted_count += 1
-    except Exception as e:
-        print(f"  Fehler beim Löschen in {work_path}: {e}", file=sys.stderr)
+            collect_results(block=False)
+            write_status(len(watched_dirs))
+            time.sleep(args.interval)
+            collect_results(block=False)
+    except KeyboardInterrupt:
+        print("\nBeenden (Strg+C): laufende Aufträge werden noch fertiggestellt...", flush=True)
+        queue.clear()
+        collect_results(block=True)
+        write_status(0)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
     
-    return deleted_count
+    print(f"{totals['rendered']} Einträge konvertiert, {totals['failed']} fehlgeschlagen.")
 
 
 def main():
@@ -191,12 +709,42 @@ def main():
     parser = argparse.ArgumentParser(description='Automatische Bildkonvertierung und Verwaltung')
     parser.add_argument('--removeauto', action='store_true',
                         help='Löscht alle Bilder mit "auto" im Dateinamen aus den work_path-Verzeichnissen')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Anzahl paralleler Render-Prozesse (Standard: 1)')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Alle Einträge prüfen und nur Bilder neu rendern, deren Quellbild, Name '
+                             'oder Renderer-Parameter sich laut Render-Manifest geändert haben')
+    parser.add_argument('--profile', '-p', choices=sorted(RENDER_PROFILES), default=DEFAULT_PROFILE,
+                        help=f'Render-Profil / Ausgabegröße (Standard: {DEFAULT_PROFILE})')
+    parser.add_argument('--encoder', '-e', choices=sorted(ENCODER_PROFILES), default=DEFAULT_ENCODER,
+                        help=f'Encoder-Profil für die _auto-Bilder (Standard: {DEFAULT_ENCODER})')
+    parser.add_argument('--mem-profile', action='store_true',
+                        help='Speicherbedarf (RSS und tracemalloc) je Verarbeitungsschritt messen und am Ende ausgeben')
+    parser.add_argument('--mem-budget', type=int, metavar='MB',
+                        help='Speicherbudget in MB für alle Render-Prozesse; bei Überschreitung wird die Parallelität gesenkt')
+    parser.add_argument('--watch', action='store_true',
+                        help='Dauerbetrieb: Verzeichnisse beobachten und Einträge rendern, sobald ihre Bilder vollständig sind')
+    parser.add_argument('--interval', type=float, default=WATCH_INTERVAL,
+                        help=f'Sekunden zwischen zwei Prüfungen im Dauerbetrieb (Standard: {WATCH_INTERVAL})')
+    parser.add_argument('--debounce', type=float, default=WATCH_DEBOUNCE,
+                        help=f'Sekunden ohne Änderung, bevor ein vollständiger Bildersatz gerendert wird (Standard: {WATCH_DEBOUNCE})')
+    parser.add_argument('--status-file', default=STATUS_FILE,
+                        help='Statusdatei (JSON) mit Warteschlange und Durchsatz im Dauerbetrieb')
     args = parser.parse_args()
     # Prüfe, ob die Datenbank existiert
     if not os.path.exists(DB_PATH):
         print(f"Fehler: Datenbank nicht gefunden: {DB_PATH}", file=sys.stderr)
         sys.exit(1)
     
+    # Das Speicherbudget steuert nur die Zahl paralleler Render-Prozesse in iter_render_results
+    if args.mem_budget and (args.workers <= 1 or args.watch):
+        print("Hinweis: --mem-budget wird ignoriert; es gilt nur für mehrere Render-Prozesse "
+              "(--workers > 1) und nicht im Dauerbetrieb (--watch).", file=sys.stderr)
+    
+    if args.watch:
+        watch(args, os.path.dirname(os.path.abspath(__file__)))
+        return
+    
     # Hole alle Einträge mit work_path
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
@@ -216,95 +764,143 @@ def main():
     base_dir = os.path.dirname(os.path.abspath(__file__))
     
     if args.removeauto:
-        # Lösche alle auto-Bilder
+        # Alle Verzeichnisse in einem Durchgang einlesen, dann die auto-Bilder löschen
+        full_paths = [resolve_work_path(entry[1], base_dir) for entry in entries]
+        dir_indexes = scan_work_dirs(full_paths)
         total_deleted = 0
-        for entry in entries:
-            entry_id, work_path, vorname, name = entry
-            
-            # Konvertiere relativen Pfad zu absolutem Pfad falls nötig
-            if not os.path.isabs(work_path):
-                full_path = os.path.join(base_dir, work_path)
-            else:
-                full_path = work_path
-            
-            full_path = os.path.normpath(full_path)
-            
-            if os.path.isdir(full_path):
+        for (entry_id, work_path, vorname, name), full_path in zip(entries, full_paths):
+            dir_index = dir_indexes[full_path]
+            if dir_index is not None and dir_index['auto']:
                 print(f"\nPrüfe: {full_path} ({vorname} {name})")
-                deleted = remove_auto_images_from_path(full_path)
-                total_deleted += deleted
+                total_deleted += remove_auto_images_from_path(full_path, dir_index['auto'])
+                # Mehrere Einträge mit demselben Verzeichnis nicht doppelt löschen
+                dir_index['auto'] = []
         
         print(f"\n{total_deleted} Bilder mit 'auto' im Namen gelöscht.")
+        pruned = prune_render_manifest()
+        if pruned:
+            print(f"{pruned} Einträge aus dem Render-Manifest entfernt.")
         return
     
-    # Standard: Bilder konvertieren (nur Einträge mit leeren final_picture)
-    entries = get_entries_with_work_path()
+    if args.refresh:
+        # Alle Einträge prüfen; gerendert wird nur, was sich laut Manifest geändert hat
+        entries = get_all_entries_with_work_path()
+    else:
+        # Standard: Bilder konvertieren (nur Einträge mit leeren final_picture)
+        entries = get_entries_with_work_path()
     
     if not entries:
-        print("Keine Einträge mit work_path und leeren final_picture-Spalten gefunden.")
+        if args.refresh:
+            print("Keine Einträge mit work_path gefunden.")
+        else:
+            print("Keine Einträge mit work_path und leeren final_picture-Spalten gefunden.")
         return
     
-    # Basis-Verzeichnis für work_path
-    base_dir = os.path.dirname(os.path.abspath(__file__))
+    manifest = load_render_manifest()
+    render_params = json.dumps(get_render_params(profile=args.profile, encoder=args.encoder), sort_keys=True)
     
-    processed_count = 0
+    # Alle work_path-Verzeichnisse in einem parallelen Durchgang einlesen
+    full_paths = [resolve_work_path(entry[1], base_dir) for entry in entries]
+    start_time = time.monotonic()
+    dir_indexes = scan_work_dirs(full_paths)
+    print(f"{len(dir_indexes)} Verzeichnisse in {time.monotonic() - start_time:.1f} s eingelesen.")
     
-    for entry in entries:
+    # Aufträge sammeln: Einträge, bei denen alle 3 Bilder vorhanden sind
+    jobs = []
+    person_names = {}
+    empty_final_ids = set()
+    unchanged_count = 0
+    for entry, full_path in zip(entries, full_paths):
         entry_id, work_path, fp1, fp2, fp3, vorname, name = entry
         
-        # Konvertiere relativen Pfad zu absolutem Pfad falls nötig
-        if not os.path.isabs(work_path):
-            full_path = os.path.join(base_dir, work_path)
-        else:
-            full_path = work_path
-        
-        # Normalisiere den Pfad
-        full_path = os.path.normpath(full_path)
-        
         # Prüfe, ob alle 3 Bilder vorhanden sind
-        img_1, img_2, img_3 = get_image_files_in_path(full_path)
+        img_1, img_2, img_3 = get_image_files_in_path(full_path, dir_indexes[full_path])
         if not img_1:
             continue
         
-        print(f"\nVerarbeite ID {entry_id}: {vorname} {name}")
-        print(f"  Pfad: {full_path}")
-        
-        # Konvertiere die Bilder
-        final_paths = []
         person_name = f"{vorname} {name}" if vorname and name else (vorname or name or "Unbekannt")
+        image_paths = [img_1, img_2, img_3]
         
-        for i, img_path in enumerate([img_1, img_2, img_3], 1):
-            # Erstelle Zieldateiname mit _auto Suffix (vor der Nummer)
-            dir_name = os.path.dirname(img_path)
-            base_name = os.path.splitext(os.path.basename(img_path))[0]
-            # Füge _auto vor der Nummer ein: z.B. Ella_Günther_1 -> Ella_Günther_auto_1
-            dest_base = base_name[:-2] + "auto_" + base_name[-1]  # _1 -> _auto_1
-            dest_path = os.path.join(dir_name, dest_base + ".jpg")  # Immer als JPG speichern
-            
-            print(f"  Konvertiere Bild {i}: {os.path.basename(img_path)} -> {os.path.basename(dest_path)}")
-            
-            # Konvertiere das Bild
-            success, message = execute_autoconvert(img_path, dest_path, person_name)
-            
-            if success:
-                final_paths.append(dest_path)
-                print(f"    ✓ Erfolgreich konvertiert")
-            else:
-                print(f"    ✗ Fehler: {message}")
-                final_paths.append(None)
+        up_to_date = []
+        if args.refresh:
+            existing_outputs = set(dir_indexes[full_path]['auto'])
+            for img_path in image_paths:
+                dest_path = get_auto_dest_path(img_path, args.encoder)
+                reason = get_refresh_reason(manifest.get(dest_path), img_path, dest_path,
+                                            person_name, render_params, existing_outputs)
+                if reason is None:
+                    up_to_date.append(img_path)
+                else:
+                    print(f"ID {entry_id}: {os.path.basename(dest_path)} wird neu gerendert ({reason})")
+            if len(up_to_date) == len(image_paths):
+                unchanged_count += 1
+                continue
         
-        # Aktualisiere die Datenbank, wenn alle 3 Bilder konvertiert wurden
-        if all(final_paths):
-            update_database_final_pictures(entry_id, final_paths)
-            processed_count += 1
+        # final_picture-Spalten nur setzen, wenn sie noch leer sind (manuelle Auswahl bleibt erhalten)
+        if not (fp1 or fp2 or fp3):
+            empty_final_ids.add(entry_id)
+        person_names[entry_id] = person_name
+        jobs.append((entry_id, person_name, image_paths, up_to_date, args.profile, args.encoder))
+    
+    if args.refresh:
+        print(f"{unchanged_count} Einträge sind unverändert.")
+    if not jobs:
+        print("\nKeine Einträge verarbeitet.")
+        return
+    
+    workers = max(1, args.workers)
+    print(f"{len(jobs)} Einträge mit vollständigen Bildern, {workers} Render-Prozess(e), Profil {args.profile}, Encoder {args.encoder}.")
+    
+    # Ergebnisse im Hauptprozess sammeln, Datenbank am Ende in einer Transaktion aktualisieren
+    updates = []
+    manifest_rows = []
+    processed_count = 0
+    interrupted = False
+    start_time = time.monotonic()
+    stage_lists = []
+    worker_peak = 0
+    mem_budget = args.mem_budget * 1024 * 1024 if args.mem_budget else None
+    results = iter_render_results(jobs, workers, args.profile, args.mem_profile, mem_budget)
+    try:
+        for done, (entry_id, final_paths, log_lines, rendered, mem) in enumerate(results, 1):
+            print(f"\r\033[KVerarbeitet ID {entry_id}:")
+            print("\n".join(log_lines))
+            stage_lists.extend(mem['stages'])
+            worker_peak = max(worker_peak, mem['peak_rss'])
+            # Manifest auch für einzeln erfolgreiche Bilder, damit --refresh sie nicht erneut rendert
+            for dest_path, img_path, size, mtime_ns, source_hash in rendered:
+                manifest_rows.append((dest_path, entry_id, img_path, size, mtime_ns, source_hash,
+                                      person_names[entry_id], render_params))
+            if all(final_paths):
+                processed_count += 1
+                if entry_id in empty_final_ids:
+                    updates.append((entry_id, final_paths))
+            else:
+                print(f"  ✗ Nicht alle Bilder konnten konvertiert werden, Datenbank wird nicht aktualisiert.")
+            print_progress(done, len(jobs), start_time)
+    except KeyboardInterrupt:
+        # iter_render_results hat alle fertigen Ergebnisse bereits geliefert
+        interrupted = True
+    print()
+    
+    save_render_results(updates, manifest_rows)
+    
+    if args.mem_profile:
+        print(f"\nSpeicherprofil ({len(stage_lists)} Bilder, RSS nach dem jeweiligen Schritt):")
+        print(format_stage_report(summarize_stages(stage_lists)))
+        if workers > 1:
+            print(f"  Spitze je Render-Prozess: {format_bytes(worker_peak)}, Hauptprozess: {format_bytes(get_peak_rss())}")
         else:
-            print(f"  ✗ Nicht alle Bilder konnten konvertiert werden, Datenbank nicht aktualisiert.")
+            # Mit einem Prozess wird im Hauptprozess gerendert, dessen Spitze enthält das Rendern
+            print(f"  Spitze beim Rendern (im Hauptprozess): {format_bytes(get_peak_rss())}")
     
+    if interrupted:
+        print(f"\nAbgebrochen: {processed_count} von {len(jobs)} Einträgen konvertiert und gespeichert.")
+        sys.exit(130)
     if processed_count == 0:
         print("\nKeine Einträge verarbeitet.")
     else:
         print(f"\n{processed_count} Eintrag/Einträge erfolgreich verarbeitet.")
 
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+bench_copyengine.py - Durchsatz von dbv_copyengine gegenüber seriellem shutil.copy2
+
+Erzeugt --files Testdateien mit --size MB und kopiert sie einmal seriell mit
+shutil.copy2 (wie checkpic früher) und danach mit copy_files für jede Anzahl
+Threads aus --workers sowie in den Modi hard und reflink. Ein zweiter Lauf mit
+copy_files zeigt die Zeit für das Überspringen unveränderter Ziele.
+
+Für Messungen auf einem NAS --target auf ein Verzeichnis dort setzen.
+
+Aufruf:
+    python benchmarks/bench_copyengine.py --files 200 --size 8 --workers 1 4 8
+    python benchmarks/bench_copyengine.py --target /Volumes/nas/tmp --verify
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import dbv_copyengine
+
+
+def make_files(src_dir, count, size_mb):
+    """Erzeugt count Dateien mit Zufallsinhalt (ein Block, mehrfach geschrieben)."""
+    block = os.urandom(1024 * 1024)
+    paths = []
+    for i in range(count):
+        path = os.path.join(src_dir, f"IMG_{i:05d}.jpg")
+        with open(path, 'wb') as f:
+            for _ in range(size_mb):
+                f.write(block)
+        paths.append(path)
+    return paths
+
+
+def print_result(label, files, size_bytes, seconds):
+    print(f"{label:<24} {seconds:>8.2f} {size_bytes / (1024 * 1024) / seconds:>9.1f} {files / seconds:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Durchsatz der Kopier-Engine')
+    parser.add_argument('--files', type=int, default=100, help='Anzahl der Testdateien')
+    parser.add_argument('--size', type=int, default=4, help='Größe je Datei in MB')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8], help='Anzahl Threads')
+    parser.add_argument('--target', help='Zielverzeichnis (Standard: temporäres Verzeichnis neben den Quellen)')
+    parser.add_argument('--verify', action='store_true', help='Kopien per Prüfsumme prüfen')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src_dir = os.path.join(tmp_dir, 'src')
+        os.makedirs(src_dir)
+        sources = make_files(src_dir, args.files, args.size)
+        size_bytes = args.files * args.size * 1024 * 1024
+        target_root = tempfile.mkdtemp(dir=args.target or tmp_dir)
+
+        print(f"{args.files} Dateien à {args.size} MB nach {target_root}\n")
+        print(f"{'Verfahren':<24} {'s':>8} {'MB/s':>9} {'Dateien/s':>11}")
+        try:
+            dest_dir = os.path.join(target_root, 'serial')
+            os.makedirs(dest_dir)
+            start = time.perf_counter()
+            for path in sources:
+                shutil.copy2(path, os.path.join(dest_dir, os.path.basename(path)))
+            print_result('shutil.copy2 seriell', args.files, size_bytes, time.perf_counter() - start)
+
+            runs = [('copy', workers) for workers in args.workers]
+            runs += [('hard', max(args.workers)), ('reflink', max(args.workers))]
+            for link_mode, workers in runs:
+                dest_dir = os.path.join(target_root, f"{link_mode}_{workers}")
+                os.makedirs(dest_dir)
+                jobs = [(path, os.path.join(dest_dir, os.path.basename(path))) for path in sources]
+                stats = dbv_copyengine.copy_files(jobs, workers=workers, link_mode=link_mode, verify=args.verify)
+                print_result(f"{link_mode}, {workers} Threads", args.files, size_bytes, stats['seconds'])
+                if link_mode != 'copy' and stats['copied']:
+                    print(f"  ({stats['copied']} Dateien normal kopiert, {link_mode} wird hier nicht unterstützt)")
+
+            # Zweiter Lauf: alle Ziele unverändert
+            stats = dbv_copyengine.copy_files(jobs, workers=max(args.workers))
+            print_result('unverändert überspringen', args.files, size_bytes, stats['seconds'])
+        finally:
+            shutil.rmtree(target_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
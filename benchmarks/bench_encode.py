@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+bench_encode.py - Kodierzeit, Dateigröße und Qualität der Encoder-Profile in dbv_autoimgcov
+
+Rendert synthetische Kamerabilder (Hoch- und Querformat) einmal mit dem
+Standard-Renderprofil und speichert das Ergebnis anschließend mit jedem
+Encoder-Profil aus ENCODER_PROFILES. Ausgegeben werden pro Profil der Median
+der Kodierzeit, die mittlere Dateigröße und der PSNR gegenüber dem
+unkomprimierten Rendering.
+
+Aufruf:
+    python benchmarks/bench_encode.py --images 4 --runs 3
+"""
+
+import io
+import os
+import sys
+import time
+import tempfile
+import argparse
+import statistics
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+import dbv_autoimgcov
+from bench_render_decode import make_sample_image, psnr
+
+# (Breite, Höhe) der Quellbilder, abwechselnd Quer- und Hochformat
+SOURCE_SIZES = [(4000, 3000), (3000, 4000)]
+
+
+def encode(image, encoder):
+    """Kodiert ein Bild in den Speicher; gibt (Sekunden, Bytes) zurück."""
+    buffer = io.BytesIO()
+    settings = dbv_autoimgcov.ENCODER_PROFILES[encoder]
+    start = time.perf_counter()
+    # 'default' leitet das Format sonst aus der Dateiendung (.jpg) ab
+    image.save(buffer, settings['format'] or 'JPEG', **settings['params'])
+    return time.perf_counter() - start, buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vergleich der Encoder-Profile für gerenderte Bilder')
+    parser.add_argument('--images', type=int, default=4, help='Anzahl der Testbilder')
+    parser.add_argument('--runs', type=int, default=3, help='Messungen pro Bild und Profil (Median)')
+    parser.add_argument('--profile', choices=sorted(dbv_autoimgcov.RENDER_PROFILES),
+                        default=dbv_autoimgcov.DEFAULT_PROFILE, help='Render-Profil der Testbilder')
+    args = parser.parse_args()
+
+    rendered = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i in range(args.images):
+            width, height = SOURCE_SIZES[i % len(SOURCE_SIZES)]
+            path = os.path.join(tmp_dir, f"sample_{i}.jpg")
+            make_sample_image(path, width, height, seed=i)
+            rendered.append(dbv_autoimgcov.process_image(path, 'Maximilian Mustermann', profile=args.profile))
+
+    print(f"{len(rendered)} Bilder, Profil {args.profile}, Median aus {args.runs} Läufen\n")
+    print(f"{'Encoder':<12} {'Format':<7} {'ms/Bild':>9} {'KB/Bild':>9} {'PSNR dB':>8}")
+    for encoder, settings in dbv_autoimgcov.ENCODER_PROFILES.items():
+        times, sizes, qualities = [], [], []
+        for image in rendered:
+            runs = [encode(image, encoder) for _ in range(args.runs)]
+            times.append(statistics.median(seconds for seconds, _ in runs))
+            data = runs[-1][1]
+            sizes.append(len(data))
+            with Image.open(io.BytesIO(data)) as decoded:
+                qualities.append(psnr(image, decoded))
+        print(f"{encoder:<12} {settings['format'] or 'JPEG':<7} {statistics.mean(times) * 1000:>9.1f} "
+              f"{statistics.mean(sizes) / 1024:>9.0f} {min(qualities):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+bench_render_decode.py - Vergleich schnelles vs. vollständiges Dekodieren in dbv_autoimgcov
+
+Erzeugt synthetische Kamerabilder (Hoch- und Querformat, verschiedene Auflösungen)
+und rendert sie jeweils mit fast_decode=False und fast_decode=True.
+Ausgegeben werden Zeit pro Bild, Beschleunigung und PSNR der beiden Ergebnisse.
+Das PSNR wird nur über die Pixel des eingefügten Fotos berechnet; schwarze
+Ränder und der deckende Namenstext sind in beiden Ergebnissen gleich und
+würden den Wert sonst nach oben verfälschen.
+Liegt ein PSNR unter --min-psnr, endet das Skript mit Rückgabecode 1
+(Qualitätsprüfung, z.B. vor dem Ändern der Draft-Parameter).
+
+--check vergleicht nur ein immer gleich erzeugtes 24MP-Testbild (CHECK_SIZE,
+feste Zufallszahlen) ohne Zeitmessung und eignet sich als schnelle Prüfung
+(wenige Sekunden) nach Änderungen an process_image.
+
+Aufruf:
+    python benchmarks/bench_render_decode.py --runs 3
+    python benchmarks/bench_render_decode.py --check
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import tempfile
+import argparse
+import statistics
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from PIL import Image, ImageDraw, ImageFilter, ImageChops, ImageStat
+
+import dbv_autoimgcov
+
+# (Bezeichnung, Breite, Höhe)
+SAMPLE_SIZES = [
+    ('12MP quer', 4000, 3000),
+    ('24MP quer', 6000, 4000),
+    ('24MP hoch', 4000, 6000),
+    ('48MP quer', 8000, 6000),
+]
+
+# Testbild für --check: groß genug, dass der schnelle Pfad verkleinert dekodiert
+CHECK_SIZE = ('24MP quer', 6000, 4000)
+
+
+def make_sample_image(path, width, height, seed=1):
+    """Erzeugt ein detailreiches Testbild (Verlauf, Linien, Formen, Rauschen) als JPEG."""
+    rng = random.Random(seed)
+    # Verlauf über eine kleine Vorlage, hochskaliert
+    base = Image.new('RGB', (64, 48))
+    for x in range(64):
+        for y in range(48):
+            base.putpixel((x, y), (x * 4, y * 5, 255 - x * 3))
+    img = base.resize((width, height), Image.BILINEAR)
+    draw = ImageDraw.Draw(img)
+    for _ in range(200):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = rng.randrange(width), rng.randrange(height)
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        if rng.random() < 0.5:
+            draw.line([(x0, y0), (x1, y1)], fill=color, width=rng.randrange(2, 12))
+        else:
+            draw.ellipse([min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)], outline=color, width=6)
+    # Feines Korn wie bei Kamerabildern (aus rng, damit das Bild bei gleichem seed identisch ist)
+    noise_size = (width // 4, height // 4)
+    noise = Image.frombytes('L', noise_size, rng.randbytes(noise_size[0] * noise_size[1]))
+    noise = noise.point(lambda v: 128 + (v - 128) * 55 // 100)
+    noise = noise.resize((width, height), Image.NEAREST).convert('RGB')
+    img = ImageChops.add(img, noise.filter(ImageFilter.GaussianBlur(1)), scale=1.3, offset=-40)
+    img.save(path, quality=92)
+    img.close()
+
+
+def get_photo_mask(tmp_dir, width, height, name):
+    """
+    Maske der Fotopixel im Ergebnis von process_image.
+
+    Ein weißes und ein schwarzes Quellbild gleicher Größe ergeben dasselbe
+    Layout; sie unterscheiden sich genau dort, wo das Foto eingefügt wurde und
+    nicht vom deckenden Namenstext verdeckt ist.
+    """
+    renders = []
+    for color in ('white', 'black'):
+        path = os.path.join(tmp_dir, f"{color}_{width}x{height}.jpg")
+        Image.new('RGB', (width, height), color).save(path)
+        renders.append(dbv_autoimgcov.process_image(path, name, fast_decode=False))
+    return ImageChops.difference(*renders).convert('L').point(lambda v: 255 if v else 0)
+
+
+def psnr(img_a, img_b, mask=None):
+    """PSNR zweier gleich großer RGB-Bilder in dB, mit mask nur über die Pixel der Maske."""
+    diff = ImageChops.difference(img_a.convert('RGB'), img_b.convert('RGB'))
+    mse = sum(rms ** 2 for rms in ImageStat.Stat(diff, mask).rms) / 3
+    if mse == 0:
+        return float('inf')
+    return 10 * math.log10(255 ** 2 / mse)
+
+
+def time_render(path, name, fast_decode, runs):
+    """Median der Renderzeit in Sekunden und das letzte Ergebnisbild."""
+    times = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = dbv_autoimgcov.process_image(path, name, fast_decode=fast_decode)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def check_quality(name, min_psnr):
+    """Rendert CHECK_SIZE einmal voll und einmal schnell dekodiert; True, wenn das PSNR reicht."""
+    label, width, height = CHECK_SIZE
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f"{width}x{height}.jpg")
+        make_sample_image(path, width, height)
+        full_img = dbv_autoimgcov.process_image(path, name, fast_decode=False)
+        fast_img = dbv_autoimgcov.process_image(path, name, fast_decode=True)
+        quality = psnr(full_img, fast_img, get_photo_mask(tmp_dir, width, height, name))
+    ok = quality >= min_psnr
+    print(f"{label}: PSNR {quality:.1f} dB (Minimum {min_psnr:.1f} dB) - {'OK' if ok else 'FEHLER'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Schnelles vs. vollständiges Dekodieren im Renderer')
+    parser.add_argument('--runs', type=int, default=3, help='Messungen pro Bild und Modus (Median)')
+    parser.add_argument('--min-psnr', type=float, default=40.0, help='Mindest-PSNR in dB für die Qualitätsprüfung')
+    parser.add_argument('--check', action='store_true',
+                        help='Nur Qualitätsprüfung mit einem festen Testbild, ohne Zeitmessung')
+    args = parser.parse_args()
+
+    name = 'Maximilian Mustermann'
+    if args.check:
+        sys.exit(0 if check_quality(name, args.min_psnr) else 1)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'Bild':<12} {'voll ms':>9} {'schnell ms':>11} {'Faktor':>7} {'PSNR dB':>8}")
+        for label, width, height in SAMPLE_SIZES:
+            path = os.path.join(tmp_dir, f"{width}x{height}.jpg")
+            make_sample_image(path, width, height)
+
+            full_time, full_img = time_render(path, name, False, args.runs)
+            fast_time, fast_img = time_render(path, name, True, args.runs)
+            quality = psnr(full_img, fast_img, get_photo_mask(tmp_dir, width, height, name))
+            if quality < args.min_psnr:
+                failed = True
+            print(f"{label:<12} {full_time * 1000:>9.0f} {fast_time * 1000:>11.0f} "
+                  f"{full_time / fast_time:>6.1f}x {quality:>8.1f}{'  < MIN' if quality < args.min_psnr else ''}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
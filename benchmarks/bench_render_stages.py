@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+bench_render_stages.py - Laufzeit von dbv_autoimgcov.process_image aufgeteilt nach Verarbeitungsschritten
+
+Erzeugt synthetische Testbilder im Hoch-, Quer- und nahezu quadratischen Format
+in mehreren Größen (Standard 2, 12 und 48 MP) als JPEG, PNG und TIFF, jeweils
+ohne und mit EXIF-Drehung (Orientierung 6, Pixel gedreht gespeichert).
+Gemessen wird pro Bild die Zeit für Dekodieren, Verkleinern, Orientierung,
+Textlayout, Zusammensetzen, Namensüberblendung und Kodieren, anschließend der
+Durchsatz (Bilder/s) mit einem und mit mehreren Prozessen. Die Namensüberblendung
+wird zusätzlich ohne Cache gemessen, einmal als Sprite wie in get_name_overlay und
+einmal wie früher mit Ebenen in Leinwandgröße (vorher/nachher).
+
+Die Schrift kommt standardmäßig aus Pillow selbst (ImageFont.load_default),
+damit die Messung ohne installierte Systemschriften und offline gleich abläuft.
+
+Mit --json werden die Ergebnisse gespeichert; --compare prüft gegen eine
+frühere Messung und endet mit Rückgabecode 1, wenn ein Bild um mehr als
+--tolerance langsamer geworden ist.
+
+Aufruf:
+    python benchmarks/bench_render_stages.py --quick
+    python benchmarks/bench_render_stages.py --runs 3 --json baseline.json
+    python benchmarks/bench_render_stages.py --runs 3 --compare baseline.json
+"""
+
+import io
+import os
+import sys
+import json
+import math
+import time
+import tempfile
+import argparse
+import functools
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image, ImageDraw, ImageFont
+
+import dbv_autoimgcov
+from bench_render_decode import make_sample_image
+
+# Seitenverhältnis Breite/Höhe der Testbilder
+ASPECTS = {
+    'quer': 3 / 2,
+    'hoch': 2 / 3,
+    'quadrat': 1.02,
+}
+FORMATS = {
+    'jpeg': ('.jpg', {'quality': 92}),
+    'png': ('.png', {'compress_level': 1}),
+    'tiff': ('.tif', {}),
+}
+# Reihenfolge der Marken in process_image, danach das Kodieren
+STAGES = ['decode', 'resize', 'orientation', 'layout', 'compose', 'text', 'encode']
+
+
+class StageTimer:
+    """Summiert die Zeit zwischen den mark()-Aufrufen von process_image je Schritt."""
+
+    def __init__(self):
+        self.times = dict.fromkeys(STAGES, 0.0)
+        self.last = time.perf_counter()
+
+    def start(self):
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.times[stage] += now - self.last
+        self.last = now
+
+
+def use_bundled_font():
+    """Pillows eingebaute Schrift statt der Systemschriften verwenden (auch in Worker-Prozessen)."""
+    @functools.lru_cache(maxsize=dbv_autoimgcov.FONT_CACHE_SIZE)
+    def load_bundled_font(font_size):
+        return ImageFont.load_default(font_size)
+    dbv_autoimgcov.load_font = load_bundled_font
+
+
+def make_test_images(tmp_dir, sizes, formats):
+    """
+    Erzeugt die Testbilder.
+
+    Returns:
+        list: (bezeichnung, pfad) für jede Kombination aus Größe, Format, Seitenverhältnis und EXIF
+    """
+    images = []
+    for megapixels in sizes:
+        for aspect_name, aspect in ASPECTS.items():
+            width = int(math.sqrt(megapixels * 1_000_000 * aspect))
+            height = int(megapixels * 1_000_000 / width)
+            base_path = os.path.join(tmp_dir, f"base_{megapixels}_{aspect_name}.jpg")
+            make_sample_image(base_path, width, height, seed=megapixels)
+
+            with Image.open(base_path) as base:
+                base.load()
+                for format_name in formats:
+                    ext, params = FORMATS[format_name]
+                    for rotated in (False, True):
+                        label = f"{megapixels}MP {aspect_name} {format_name}{' exif6' if rotated else ''}"
+                        path = os.path.join(tmp_dir, label.replace(' ', '_') + ext)
+                        if rotated:
+                            # Gespeichert um 90° gedreht, Orientierung 6 dreht es für die Anzeige zurück
+                            exif = Image.Exif()
+                            exif[dbv_autoimgcov.EXIF_ORIENTATION_TAG] = 6
+                            stored = base.transpose(Image.Transpose.ROTATE_90)
+                            stored.save(path, exif=exif.tobytes(), **params)
+                            stored.close()
+                        else:
+                            base.save(path, **params)
+                        images.append((label, path))
+            os.remove(base_path)
+    return images
+
+
+def encode(image, encoder):
+    """Kodiert ein Bild in den Speicher wie execute_autoconvert (ohne Dateizugriff)."""
+    settings = dbv_autoimgcov.ENCODER_PROFILES[encoder]
+    buffer = io.BytesIO()
+    image.save(buffer, settings['format'] or 'JPEG', **settings['params'])
+    return buffer.getbuffer().nbytes
+
+
+def measure_stages(images, runs, encoder, profile, images_per_name):
+    """
+    Misst jedes Bild runs-mal.
+
+    Returns:
+        dict: bezeichnung -> {schritt: Sekunden pro Bild (Median), 'total': ...}
+    """
+    results = {}
+    counter = 0
+    for label, path in images:
+        samples = []
+        for _ in range(runs):
+            # Neuer Name alle images_per_name Bilder: Layout und Überblendung sind dann nicht im Cache
+            name = f"Teilnehmer{counter // images_per_name} Mustermann"
+            counter += 1
+            timer = StageTimer()
+            timer.start()
+            image = dbv_autoimgcov.process_image(path, name, profile=profile, profiler=timer)
+            encode(image, encoder)
+            timer.mark('encode')
+            image.close()
+            samples.append(timer.times)
+        result = {stage: statistics.median(sample[stage] for sample in samples) for stage in STAGES}
+        result['total'] = statistics.median(sum(sample.values()) for sample in samples)
+        results[label] = result
+    return results
+
+
+def render_overlay_full_canvas(person_name, is_vertical, shift_right, profile):
+    """
+    Namensüberblendung wie vor dem Sprite in Balkengröße (zum Vergleich): Balken, Schatten und Text
+    auf RGBA-Ebenen in Leinwandgröße, zweimal alpha_composite über die ganze Leinwand, dann zugeschnitten.
+    Die Position ist vereinfacht (unten mittig), der Aufwand hängt nur von Leinwand und Schrift ab.
+
+    Returns:
+        tuple: (RGBA-Sprite, (x, y)) wie get_name_overlay
+    """
+    canvas_width, canvas_height = dbv_autoimgcov.RENDER_PROFILES[profile]
+    scale = canvas_height / dbv_autoimgcov.REFERENCE_HEIGHT
+    font_size, text, text_width, text_height = dbv_autoimgcov.get_text_layout(person_name, is_vertical, scale)
+    font = dbv_autoimgcov.load_font(font_size)
+    layer = Image.new('RGBA', (canvas_width, canvas_height), (0, 0, 0, 0))
+    bar_height = text_height + 2 * round(dbv_autoimgcov.padding_vertical * scale)
+    if not is_vertical:
+        layer.paste(Image.new('RGBA', (canvas_width, bar_height), dbv_autoimgcov.darker_gray),
+                    (0, canvas_height - bar_height))
+    text_position = ((canvas_width - text_width) // 2, canvas_height - bar_height)
+    shadow_offset = round(4 * scale)
+    for offset, color in ((shadow_offset, (0, 0, 0)), (0, (255, 215, 0))):
+        mask = Image.new('L', layer.size, 0)
+        ImageDraw.Draw(mask).text((text_position[0] + offset, text_position[1] + offset), text,
+                                  fill=255, font=font, align="center")
+        glyphs = Image.new('RGBA', layer.size, color + (0,))
+        glyphs.putalpha(mask)
+        composited = Image.alpha_composite(layer, glyphs)
+        for image in (layer, glyphs, mask):
+            image.close()
+        layer = composited
+    bbox = layer.getchannel('A').getbbox()
+    sprite = layer.crop(bbox)
+    layer.close()
+    return sprite, bbox[:2]
+
+
+def measure_overlay(runs, profile):
+    """
+    Zeit für eine Namensüberblendung ohne Cache (erstes Bild eines Teilnehmers).
+
+    Returns:
+        dict: 'quer'/'hoch' -> {'vorher': Sekunden mit Leinwand-Ebenen, 'sprite': Sekunden mit get_name_overlay}
+    """
+    variants = (('vorher', render_overlay_full_canvas), ('sprite', dbv_autoimgcov.get_name_overlay.__wrapped__))
+    results = {}
+    for orientation, is_vertical in (('quer', False), ('hoch', True)):
+        results[orientation] = {}
+        for variant, render in variants:
+            samples = []
+            for run in range(runs):
+                # Eigener Name je Lauf und Variante: auch das Textlayout ist nicht im Cache
+                name = f"Überblendung{run} {variant.capitalize()}"
+                start = time.perf_counter()
+                sprite, _ = render(name, is_vertical, True, profile)
+                samples.append(time.perf_counter() - start)
+                sprite.close()
+            results[orientation][variant] = statistics.median(samples)
+    return results
+
+
+def render_file(path, name, encoder, profile):
+    """Ein Bild vollständig rendern und kodieren (für die Durchsatzmessung in Worker-Prozessen)."""
+    image = dbv_autoimgcov.process_image(path, name, profile=profile)
+    encode(image, encoder)
+    image.close()
+
+
+def measure_throughput(images, processes, rounds, encoder, profile):
+    """Bilder pro Sekunde, wenn alle Testbilder rounds-mal mit processes Prozessen gerendert werden."""
+    paths = [path for _, path in images] * rounds
+    names = [f"Durchsatz{i // 3} Mustermann" for i in range(len(paths))]
+    with ProcessPoolExecutor(max_workers=processes, initializer=use_bundled_font) as executor:
+        # Prozesse starten und Schriften laden, bevor die Zeit läuft
+        list(executor.map(dbv_autoimgcov.warm_font_cache, [profile] * processes))
+        start = time.perf_counter()
+        list(executor.map(render_file, paths, names, [encoder] * len(paths), [profile] * len(paths)))
+        return len(paths) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Laufzeit von process_image je Verarbeitungsschritt')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2, 12, 48], help='Bildgrößen in Megapixeln')
+    parser.add_argument('--formats', nargs='+', choices=sorted(FORMATS), default=['jpeg', 'png', 'tiff'],
+                        help='Dateiformate der Testbilder')
+    parser.add_argument('--quick', action='store_true', help='Nur 2 und 12 MP als JPEG (schneller Überblick)')
+    parser.add_argument('--runs', type=int, default=3, help='Messungen pro Bild (Median)')
+    parser.add_argument('--profile', choices=sorted(dbv_autoimgcov.RENDER_PROFILES),
+                        default=dbv_autoimgcov.DEFAULT_PROFILE, help='Render-Profil')
+    parser.add_argument('--encoder', choices=sorted(dbv_autoimgcov.ENCODER_PROFILES),
+                        default=dbv_autoimgcov.DEFAULT_ENCODER, help='Encoder-Profil')
+    parser.add_argument('--images-per-name', type=int, default=1,
+                        help='Bilder pro Name; 1 misst das Textrendern bei jedem Bild, 3 entspricht einem Teilnehmer')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help='Prozesse für die Durchsatzmessung (zusätzlich zu 1 Prozess)')
+    parser.add_argument('--rounds', type=int, default=2, help='Durchläufe aller Bilder für die Durchsatzmessung')
+    parser.add_argument('--system-fonts', action='store_true', help='Systemschriften statt der Pillow-Schrift verwenden')
+    parser.add_argument('--json', help='Ergebnisse als JSON speichern')
+    parser.add_argument('--compare', help='Mit einer früheren JSON-Messung vergleichen')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Erlaubte Verlangsamung gegenüber --compare (0.2 = 20 %%)')
+    args = parser.parse_args()
+
+    if args.quick:
+        args.sizes, args.formats = [2, 12], ['jpeg']
+    if not args.system_fonts:
+        use_bundled_font()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"Erzeuge Testbilder ({', '.join(f'{size} MP' for size in args.sizes)}; {', '.join(args.formats)})...")
+        images = make_test_images(tmp_dir, args.sizes, args.formats)
+        dbv_autoimgcov.warm_font_cache(args.profile)
+
+        stages = measure_stages(images, args.runs, args.encoder, args.profile, args.images_per_name)
+        print(f"\nProfil {args.profile}, Encoder {args.encoder}, Median aus {args.runs} Läufen, Zeiten in ms\n")
+        print(f"{'Bild':<26}" + "".join(f"{stage:>12}" for stage in STAGES) + f"{'gesamt':>10}{'Bilder/s':>10}")
+        for label, result in stages.items():
+            print(f"{label:<26}" + "".join(f"{result[stage] * 1000:>12.1f}" for stage in STAGES)
+                  + f"{result['total'] * 1000:>10.1f}{1 / result['total']:>10.1f}")
+
+        overlay = measure_overlay(max(args.runs, 10), args.profile)
+        print(f"\nNamensüberblendung ohne Cache (ms){'':<4}{'vorher':>10}{'sprite':>10}")
+        for orientation, result in overlay.items():
+            print(f"{orientation:<38}{result['vorher'] * 1000:>10.1f}{result['sprite'] * 1000:>10.1f}")
+
+        throughput = {}
+        for processes in sorted({1, max(1, args.processes)}):
+            throughput[processes] = measure_throughput(images, processes, args.rounds, args.encoder, args.profile)
+        print()
+        for processes, images_per_second in throughput.items():
+            print(f"Durchsatz mit {processes} Prozess(en): {images_per_second:.1f} Bilder/s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'profile': args.profile, 'encoder': args.encoder, 'stages': stages,
+                       'overlay': overlay, 'throughput': throughput}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['stages']
+        slower = [(label, baseline[label]['total'], result['total']) for label, result in stages.items()
+                  if label in baseline and result['total'] > baseline[label]['total'] * (1 + args.tolerance)]
+        print(f"\nVergleich mit {args.compare}: {len(slower)} Bild(er) mehr als {args.tolerance:.0%} langsamer")
+        for label, before, after in slower:
+            print(f"  {label:<26} {before * 1000:>8.1f} ms -> {after * 1000:>8.1f} ms")
+        sys.exit(1 if slower else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+bench_web_index.py - Messung von Time-to-first-byte und Übertragungsgröße der Übersicht (/)
+
+Erzeugt eine temporäre Datenbank mit vielen Einträgen und ruft die Übersicht
+über den Flask-Testclient ab:
+- komplett gerendert (render_template) vs. gestreamt (stream_template)
+- unkomprimiert vs. gzip (Accept-Encoding)
+
+Aufruf:
+    python benchmarks/bench_web_index.py --rows 5000 --runs 5
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import argparse
+import statistics
+
+# Repository-Verzeichnis für die Importe und Templates
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import db_viewer_web
+
+
+def create_database(db_path, row_count):
+    """Legt eine Datenbank nach db_schema.txt mit row_count Einträgen an."""
+    conn = sqlite3.connect(db_path)
+    with open(os.path.join(REPO_DIR, 'db_schema.txt'), 'r') as f:
+        conn.executescript(f.read())
+    conn.executemany(
+        "INSERT INTO anmeldungen (bestellnummer, name, vorname, uid, feiertag, feieruhrzeit, location, hint, work_path, status) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(f"B{i:06d}", f"Nachname{i}", f"Vorname{i}", f"{i:08x}", f"{(i % 28) + 1:02d}.05.2025",
+          f"{10 + i % 6}-00", "Stadthalle Musterstadt", "Hinweis" if i % 7 == 0 else "",
+          f"/bilder/{i}" if i % 2 else "", "neu")
+         for i in range(row_count)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure(client, url, gzip_enabled, runs):
+    """Ruft url runs-mal ab und gibt (ttfb_ms, total_ms, bytes) als Median zurück."""
+    headers = {'Accept-Encoding': 'gzip'} if gzip_enabled else {'Accept-Encoding': 'identity'}
+    ttfbs, totals, sizes = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers, buffered=False)
+        chunks = iter(response.response)
+        first = next(chunks, b"")
+        ttfb = time.perf_counter() - start
+        size = len(first if isinstance(first, bytes) else first.encode('utf-8'))
+        for chunk in chunks:
+            size += len(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+        total = time.perf_counter() - start
+        response.close()
+        ttfbs.append(ttfb * 1000)
+        totals.append(total * 1000)
+        sizes.append(size)
+    return statistics.median(ttfbs), statistics.median(totals), statistics.median(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Misst TTFB und Größe der Übersichtsseite')
+    parser.add_argument('--rows', type=int, default=5000, help='Anzahl der Einträge in der Testdatenbank')
+    parser.add_argument('--runs', type=int, default=5, help='Messungen pro Variante (Median)')
+    args = parser.parse_args()
+
+    os.chdir(REPO_DIR)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        create_database(db_path, args.rows)
+        client = db_viewer_web.app.test_client()
+        url = f"/?db={db_path}"
+
+        print(f"{args.rows} Einträge, Median aus {args.runs} Läufen\n")
+        print(f"{'Variante':<30} {'TTFB ms':>10} {'Gesamt ms':>10} {'Bytes':>12}")
+        for streamed in (False, True):
+            db_viewer_web.STREAM_INDEX = streamed
+            for gzip_enabled in (False, True):
+                ttfb, total, size = measure(client, url, gzip_enabled, args.runs)
+                label = f"{'stream' if streamed else 'render'} + {'gzip' if gzip_enabled else 'identity'}"
+                print(f"{label:<30} {ttfb:>10.1f} {total:>10.1f} {size:>12,.0f}")
+        db_viewer_web.STREAM_INDEX = True
+
+
+if __name__ == "__main__":
+    main()
@@ -2,244 +2,610 @@
 Implementierung des CheckPic-Befehls für den Datenbankmanager.
 Sucht nach Bildern im src_path, die den Vor- und Nachnamen enthalten,
 wobei der Vorname am Anfang stehen muss.
+
+Alle Teilnehmer einer Feier teilen sich denselben src_path. Die Einträge werden
+daher nach src_path gruppiert, jeder Verzeichnisbaum wird nur einmal
+durchlaufen und alle Einträge der Gruppe werden gegen diese Dateiliste geprüft.
+Namen und Dateinamen werden über kanonische Schlüssel verglichen (dbv_namekeys:
+Umlaute, Akzente, Groß-/Kleinschreibung und Trennzeichen spielen keine Rolle).
+Die Schlüssel einer Gruppe werden einmal in einen NameMatcher (dbv_namematch)
+kompiliert; Bilder, die zu mehreren Einträgen passen, werden gemeldet.
+Mit fuzzy werden Bilder ohne exakten Treffer zusätzlich tippfehlertolerant
+zugeordnet und getrennt als "Unscharf" ausgegeben. Mit report werden für alle
+nicht zugeordneten Bilder die wahrscheinlichsten Einträge desselben Feiertags
+und derselben Location als CSV und in der Tabelle checkpic_unassigned abgelegt.
+
+Kopieren und Verschieben übernimmt dbv_copyengine: parallel, mit Hardlinks oder
+Reflinks statt Kopien, unveränderte Ziele werden übersprungen. Alle geplanten
+Übertragungen stehen vorher im Journal (checkpic_runs/checkpic_journal); wird ein
+Lauf abgebrochen, setzt der nächste Aufruf mit demselben Ziel genau die offenen
+Übertragungen fort, ohne die Quellverzeichnisse erneut zu durchlaufen.
 """
 
 import os
-import shutil
+import csv
+from collections import OrderedDict
+
+from dbv_copyengine import copy_files, format_copy_stats, DEFAULT_WORKERS
+from dbv_namekeys import canonical_key, canonical_tokens, refresh_name_keys
+from dbv_namematch import NameMatcher, FuzzyNameMatcher, TokenIndex
+
+# Bildendungen
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff', '.jfif', '.psd')
+# Teile eines Doppelnamens, die kürzer sind, werden nicht einzeln gesucht
+MIN_NAME_PART_LENGTH = 3
+# Anzahl der vorgeschlagenen Einträge je nicht zugeordnetem Bild
+REPORT_CANDIDATES = 3
+
+# Journal-Änderungen werden spätestens nach so vielen Dateien gespeichert
+JOURNAL_COMMIT_INTERVAL = 200
+
+# Ergebnis von check_pictures
+CHECKPIC_DONE = 'fertig'
+CHECKPIC_INTERRUPTED = 'abgebrochen'  # Lauf im Journal offen, ein erneuter Aufruf setzt ihn fort
+CHECKPIC_FAILED = 'fehler'
+
+JOURNAL_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS checkpic_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        operation TEXT NOT NULL,
+        target_path TEXT NOT NULL,
+        link_mode TEXT,
+        status TEXT DEFAULT 'läuft',
+        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS checkpic_journal (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_id INTEGER NOT NULL,
+        entry_id INTEGER NOT NULL,
+        source_path TEXT NOT NULL,
+        dest_path TEXT NOT NULL,
+        work_path TEXT NOT NULL,
+        status TEXT DEFAULT 'geplant',
+        result TEXT,
+        error TEXT,
+        updated_at TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_checkpic_journal_run ON checkpic_journal(run_id, status);
+"""
 
-def execute_checkpic(db_manager, target_path=None, operation=None):
+UNASSIGNED_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS checkpic_unassigned (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source_path TEXT NOT NULL,
+        feiertag TEXT,
+        location TEXT,
+        candidate_rank INTEGER,
+        entry_id INTEGER,
+        score REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_checkpic_unassigned_path ON checkpic_unassigned(source_path);
+"""
+
+def execute_checkpic(db_manager, target_path=None, operation=None, fuzzy=None, report=None,
+                     link_mode='copy', verify=False, workers=DEFAULT_WORKERS, fresh=False):
     """
     Führt den CheckPic-Befehl aus.
-    
+
     Args:
         db_manager: Eine Instanz des DatabaseManager
         target_path (str, optional): Wenn angegeben, werden gefundene Bilder in diesen Pfad verschoben oder kopiert
         operation (str, optional): 'move' zum Verschieben, 'copy' zum Kopieren der Bilder
-        
+        fuzzy (int, optional): Maximaler Editierabstand (1 oder 2) für Bilder ohne exakten Treffer
+        report (str, optional): CSV-Datei für den Bericht der nicht zugeordneten Bilder
+        link_mode (str): 'copy', 'hard' oder 'reflink' beim Kopieren
+        verify (bool): Kopien per Prüfsumme mit dem Original vergleichen
+        workers (int): Anzahl paralleler Threads für das Kopieren/Verschieben
+        fresh (bool): Einen abgebrochenen Lauf mit demselben Ziel verwerfen statt fortsetzen
+
     Returns:
         tuple: (Erfolg (bool), Nachricht (str))
     """
-    check_pictures(db_manager, target_path, operation)
+    result = check_pictures(db_manager, target_path, operation, fuzzy, report, link_mode, verify, workers, fresh)
+    if result == CHECKPIC_INTERRUPTED:
+        return False, "Prüfung der Bilder abgebrochen, ein erneuter Aufruf setzt den Lauf fort."
+    if result == CHECKPIC_FAILED:
+        return False, "Prüfung der Bilder fehlgeschlagen."
     return True, "Prüfung der Bilder abgeschlossen."
 
-def check_pictures(db_manager, target_path=None, operation=None):
+def get_match_keys(vorname_key, name_key):
+    """
+    Suchschlüssel eines Eintrags aus den gespeicherten Namensschlüsseln (dbv_namekeys).
+
+    Args:
+        vorname_key (str): Schlüssel der Vornamen, durch Leerzeichen getrennt
+        name_key (str): Schlüssel des Nachnamens, durch Leerzeichen getrennt
+
+    Returns:
+        tuple: (Vornamen, von denen einer am Anfang stehen muss,
+                Nachnamen, von denen einer enthalten sein muss)
+    """
+    first_names = (vorname_key or '').split()
+    name_parts = (name_key or '').split()
+    last_names = [''.join(name_parts)] if name_parts else []
+    # Doppelnamen: auch jeder Teil allein (z.B. nur "Lüdenscheidt" im Dateinamen)
+    if len(name_parts) > 1:
+        last_names.extend(part for part in name_parts if len(part) >= MIN_NAME_PART_LENGTH)
+    return first_names, last_names
+
+def scan_source_tree(src_path):
+    """
+    Durchläuft ein Quellverzeichnis einmal und sammelt alle Bilddateien.
+
+    Args:
+        src_path (str): Quellverzeichnis
+
+    Returns:
+        list: (Pfad, kanonischer Schlüssel des Dateinamens ohne Endung) für jedes Bild
+    """
+    images = []
+    for root, _, files in os.walk(src_path):
+        for file in files:
+            # Prüfe, ob es sich um ein Bild handelt
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                images.append((os.path.join(root, file), canonical_key(os.path.splitext(file)[0])))
+    return images
+
+def match_group_images(images, group_entries, fuzzy=None):
+    """
+    Ordnet die Bilder eines Quellverzeichnisses den Einträgen zu, die sich dieses Verzeichnis teilen.
+
+    Die Namen aller Einträge werden einmal in einen NameMatcher kompiliert, danach
+    wird jeder Dateiname nur einmal gelesen.
+
+    Args:
+        images (list): (Pfad, Schlüssel des Dateinamens) aus scan_source_tree
+        group_entries (list): Einträge mit id, vorname_key und name_key
+        fuzzy (int, optional): Maximaler Editierabstand für Bilder ohne exakten Treffer
+
+    Returns:
+        tuple: (dict Eintrags-ID -> Liste der Bildpfade,
+                Liste von (Bildpfad, sortierte Eintrags-IDs) für Bilder, die zu mehreren Einträgen passen,
+                Liste von (Bildpfad, sortierte Eintrags-IDs) für unscharfe Treffer)
+    """
+    matcher = NameMatcher()
+    fuzzy_matcher = FuzzyNameMatcher(fuzzy) if fuzzy else None
+    for entry in group_entries:
+        match_keys = get_match_keys(entry['vorname_key'], entry['name_key'])
+        matcher.add_entry(entry['id'], *match_keys)
+        if fuzzy_matcher:
+            fuzzy_matcher.add_entry(entry['id'], *match_keys)
+
+    found_images = {entry['id']: [] for entry in group_entries}
+    ambiguous = []
+    fuzzy_matches = []
+    for image_path, file_key in images:
+        entry_ids = matcher.match(file_key)
+        if not entry_ids and fuzzy_matcher:
+            # Nur eindeutige unscharfe Treffer werden zugeordnet
+            fuzzy_ids = fuzzy_matcher.match(canonical_tokens(os.path.splitext(os.path.basename(image_path))[0]))
+            if fuzzy_ids:
+                fuzzy_matches.append((image_path, sorted(fuzzy_ids)))
+                if len(fuzzy_ids) == 1:
+                    entry_ids = fuzzy_ids
+        for entry_id in entry_ids:
+            found_images[entry_id].append(image_path)
+        if len(entry_ids) > 1:
+            ambiguous.append((image_path, sorted(entry_ids)))
+    return found_images, ambiguous, fuzzy_matches
+
+def get_entry_tokens(vorname_key, name_key):
+    """Namenswörter eines Eintrags für den TokenIndex (Vornamen, Nachnamen-Teile, ganzer Nachname)."""
+    first_names, last_names = get_match_keys(vorname_key, name_key)
+    return first_names + (name_key or '').split() + last_names
+
+def rank_unassigned_images(unassigned_images, pool_entries, fuzzy=None):
+    """
+    Schlägt für nicht zugeordnete Bilder die wahrscheinlichsten Einträge vor.
+
+    Pro Feiertag und Location wird einmal ein TokenIndex über die Namen aller
+    Einträge aufgebaut, danach wird jedes Bild einmal bewertet.
+
+    Args:
+        unassigned_images (list): (Bildpfad, Liste der (feiertag, location) der Gruppe)
+        pool_entries (list): Alle Einträge mit id, feiertag, location, vorname_key und name_key
+        fuzzy (int, optional): Maximaler Editierabstand für Wörter ohne exakten Treffer
+
+    Returns:
+        list: (Bildpfad, feiertag, location, Liste von (Eintrags-ID, Punkte)) in Reihenfolge der Bilder
+    """
+    pools = {}
+    for entry in pool_entries:
+        pools.setdefault((entry['feiertag'], entry['location']), []).append(entry)
+
+    indexes = {}
+    ranked = []
+    for image_path, pool_keys in unassigned_images:
+        file_tokens = canonical_tokens(os.path.splitext(os.path.basename(image_path))[0])
+        candidates = []
+        for pool_key in pool_keys:
+            if pool_key not in indexes:
+                index = TokenIndex(fuzzy)
+                for entry in pools.get(pool_key, []):
+                    index.add_entry(entry['id'], get_entry_tokens(entry['vorname_key'], entry['name_key']))
+                indexes[pool_key] = index
+            candidates.extend(indexes[pool_key].rank(file_tokens, REPORT_CANDIDATES))
+        candidates.sort(key=lambda item: (-item[1], item[0]))
+        feiertag, location = pool_keys[0] if pool_keys else (None, None)
+        ranked.append((image_path, feiertag, location, candidates[:REPORT_CANDIDATES]))
+    return ranked
+
+def save_unassigned_report(conn, ranked, csv_path, entry_names):
+    """
+    Schreibt den Bericht als CSV (Semikolon, für Excel) und in die Tabelle checkpic_unassigned.
+
+    Die Tabelle wird bei jedem Lauf vollständig ersetzt, da checkpic immer alle Quellverzeichnisse durchläuft.
+
+    Args:
+        conn: Datenbankverbindung
+        ranked (list): Ergebnis von rank_unassigned_images
+        csv_path (str): Zieldatei
+        entry_names (dict): Eintrags-ID -> (vorname, name)
+    """
+    rows = []
+    for image_path, feiertag, location, candidates in ranked:
+        if not candidates:
+            rows.append((image_path, feiertag, location, None, None, None))
+        for rank, (entry_id, score) in enumerate(candidates, 1):
+            rows.append((image_path, feiertag, location, rank, entry_id, round(score, 3)))
+
+    with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['datei', 'feiertag', 'location', 'rang', 'id', 'vorname', 'name', 'punkte'])
+        for image_path, feiertag, location, rank, entry_id, score in rows:
+            vorname, name = entry_names.get(entry_id, ('', ''))
+            writer.writerow([image_path, feiertag or '', location or '', rank or '', entry_id or '', vorname, name,
+                             '' if score is None else f"{score:.2f}".replace('.', ',')])
+
+    conn.executescript(UNASSIGNED_SCHEMA)
+    conn.execute("DELETE FROM checkpic_unassigned")
+    conn.executemany("INSERT INTO checkpic_unassigned (source_path, feiertag, location, candidate_rank, entry_id, score) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+
+def clean_dir_name(value):
+    """Ersetzt Pfadtrenner, damit der Wert als einzelner Verzeichnisname verwendet werden kann."""
+    return value.replace('/', '-').replace('\\', '-')
+
+def get_target_dir(target_path, vorname, name, feiertag, feieruhrzeit, bestellnummer, location):
+    """
+    Zielverzeichnis eines Eintrags: Feiertag_Location/Feieruhrzeit/Vorname_Nachname_Bestellnummer
+    """
+    # Bereinige die Location (falls vorhanden) für die Verwendung im Verzeichnisnamen
+    location_clean = clean_dir_name(location) if location else ""
+
+    # Erstelle den Feiertag-Verzeichnisnamen mit Location
+    if feiertag and location_clean:
+        feiertag_dir = f"{clean_dir_name(feiertag)}_{location_clean}"
+    else:
+        feiertag_dir = clean_dir_name(feiertag) if feiertag else "Unbekannt"
+    feieruhrzeit_dir = clean_dir_name(feieruhrzeit) if feieruhrzeit else "Unbekannt"
+    person_dir = clean_dir_name(f"{vorname}_{name}_{bestellnummer}")
+
+    return os.path.join(target_path, feiertag_dir, feieruhrzeit_dir, person_dir)
+
+def find_open_run(conn, operation, target_path):
+    """
+    Sucht einen abgebrochenen Lauf mit derselben Operation und demselben Ziel.
+
+    Returns:
+        sqlite3.Row oder None
+    """
+    conn.executescript(JOURNAL_SCHEMA)
+    return conn.execute("SELECT * FROM checkpic_runs WHERE status = 'läuft' AND operation = ? AND target_path = ? "
+                        "ORDER BY id DESC LIMIT 1", (operation, target_path)).fetchone()
+
+def start_run(conn, operation, target_path, link_mode, planned):
+    """
+    Legt einen neuen Lauf an und schreibt alle geplanten Übertragungen in einer Transaktion ins Journal.
+
+    Args:
+        conn: Datenbankverbindung
+        operation (str): 'copy' oder 'move'
+        target_path (str): Absoluter Zielpfad
+        link_mode (str): Modus beim Kopieren
+        planned (list): (Eintrags-ID, quelle, ziel, work_path)
+
+    Returns:
+        int: ID des Laufs
+    """
+    conn.executescript(JOURNAL_SCHEMA)
+    cursor = conn.execute("INSERT INTO checkpic_runs (operation, target_path, link_mode) VALUES (?, ?, ?)",
+                          (operation, target_path, link_mode))
+    run_id = cursor.lastrowid
+    conn.executemany("INSERT INTO checkpic_journal (run_id, entry_id, source_path, dest_path, work_path) "
+                     "VALUES (?, ?, ?, ?, ?)", [(run_id,) + job for job in planned])
+    conn.commit()
+    return run_id
+
+def run_journal(db_manager, run, verify=False, workers=DEFAULT_WORKERS):
+    """
+    Führt alle noch nicht erledigten Übertragungen eines Laufs aus.
+
+    Erledigte Dateien werden nicht erneut geprüft. Der Status jeder Datei wird
+    im Journal festgehalten und spätestens alle JOURNAL_COMMIT_INTERVAL Dateien
+    gespeichert. Da dbv_copyengine bereits vorhandene Ziele erkennt, ist auch
+    eine Übertragung, die vor dem Speichern des Journals abgebrochen wurde,
+    gefahrlos wiederholbar.
+
+    Args:
+        db_manager: Eine Instanz des DatabaseManager (verbunden)
+        run: Zeile aus checkpic_runs
+        verify (bool): Kopien per Prüfsumme mit dem Original vergleichen
+        workers (int): Anzahl paralleler Threads
+
+    Returns:
+        str: CHECKPIC_DONE oder CHECKPIC_INTERRUPTED
+    """
+    conn = db_manager.conn
+    is_move_operation = run['operation'] == 'move'
+    operation_text = "Verschiebens" if is_move_operation else "Kopierens"
+
+    open_rows = conn.execute("SELECT id, source_path, dest_path FROM checkpic_journal "
+                             "WHERE run_id = ? AND status != 'erledigt' ORDER BY id", (run['id'],)).fetchall()
+    done_before = conn.execute("SELECT COUNT(*) FROM checkpic_journal WHERE run_id = ? AND status = 'erledigt'",
+                               (run['id'],)).fetchone()[0]
+    journal_ids = {row['dest_path']: row['id'] for row in open_rows}
+    link_mode = run['link_mode'] or 'copy'
+
+    print(f"\n{len(open_rows)} Bilder werden {'verschoben' if is_move_operation else 'kopiert'} "
+          f"({workers} Threads{'' if is_move_operation else f', Modus {link_mode}'}{', mit Prüfsumme' if verify else ''})...")
+
+    updates = []
+
+    def save_updates():
+        conn.executemany("UPDATE checkpic_journal SET status = ?, result = ?, error = ?, updated_at = CURRENT_TIMESTAMP "
+                         "WHERE id = ?", updates)
+        conn.commit()
+        updates.clear()
+
+    def on_result(src, dst, result, error):
+        if error:
+            print(f"  Fehler beim {operation_text} von {src}: {error}")
+            updates.append(('fehler', result, error, journal_ids[dst]))
+        else:
+            updates.append(('erledigt', result, None, journal_ids[dst]))
+        if len(updates) >= JOURNAL_COMMIT_INTERVAL:
+            save_updates()
+
+    interrupted = False
+    stats = None
+    try:
+        stats = copy_files([(row['source_path'], row['dest_path']) for row in open_rows], workers=workers,
+                           link_mode=link_mode, verify=verify, move=is_move_operation,
+                           on_result=on_result)
+    except KeyboardInterrupt:
+        interrupted = True
+    finally:
+        save_updates()
+
+    # work_path für jeden Eintrag mit mindestens einem übertragenen Bild (auch aus früheren Teilen des Laufs)
+    work_paths = conn.execute("SELECT DISTINCT entry_id, work_path FROM checkpic_journal "
+                              "WHERE run_id = ? AND status = 'erledigt'", (run['id'],)).fetchall()
+    try:
+        conn.executemany("UPDATE anmeldungen SET work_path = ? WHERE id = ?",
+                         [(row['work_path'], row['entry_id']) for row in work_paths])
+        conn.commit()
+    except Exception as e:
+        print(f"  Fehler beim Aktualisieren des work_path in der Datenbank: {e}")
+
+    if interrupted:
+        print(f"\n{operation_text[:-1]} abgebrochen. Ein erneuter Aufruf mit demselben Ziel setzt Lauf {run['id']} fort.")
+        return CHECKPIC_INTERRUPTED
+
+    failed = conn.execute("SELECT COUNT(*) FROM checkpic_journal WHERE run_id = ? AND status = 'fehler'",
+                          (run['id'],)).fetchone()[0]
+    conn.execute("UPDATE checkpic_runs SET status = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                 ('mit Fehlern' if failed else 'fertig', run['id']))
+    conn.commit()
+
+    print(f"\nErgebnis des {operation_text}:")
+    print(format_copy_stats(stats))
+    if done_before:
+        print(f"  - {done_before} Bilder bereits in einem früheren Aufruf erledigt")
+    print(f"  - work_path für {len(work_paths)} Einträge aktualisiert")
+    return CHECKPIC_DONE
+
+def check_pictures(db_manager, target_path=None, operation=None, fuzzy=None, report=None,
+                   link_mode='copy', verify=False, workers=DEFAULT_WORKERS, fresh=False):
     """
     Sucht nach Bildern im src_path, die den Vor- und Nachnamen enthalten,
     wobei der Vorname am Anfang stehen muss.
-    
+
     Args:
         db_manager: Eine Instanz des DatabaseManager
         target_path (str, optional): Wenn angegeben, werden gefundene Bilder in diesen Pfad verschoben oder kopiert
         operation (str, optional): 'move' zum Verschieben, 'copy' zum Kopieren der Bilder
+        fuzzy (int, optional): Maximaler Editierabstand (1 oder 2) für Bilder ohne exakten Treffer
+        report (str, optional): CSV-Datei für den Bericht der nicht zugeordneten Bilder
+        link_mode (str): 'copy', 'hard' oder 'reflink' beim Kopieren
+        verify (bool): Kopien per Prüfsumme mit dem Original vergleichen
+        workers (int): Anzahl paralleler Threads für das Kopieren/Verschieben
+        fresh (bool): Einen abgebrochenen Lauf mit demselben Ziel verwerfen statt fortsetzen
+
+    Returns:
+        str: CHECKPIC_DONE, CHECKPIC_INTERRUPTED (Lauf im Journal offen) oder CHECKPIC_FAILED
     """
+    # Lauf im Journal, sobald einer angelegt oder fortgesetzt wird
+    run = None
     try:
         db_manager.connect()
-        
+
+        # Abgebrochenen Lauf mit demselben Ziel fortsetzen, ohne die Quellverzeichnisse erneut zu durchsuchen
+        if target_path:
+            target_path = os.path.abspath(target_path)
+            open_run = find_open_run(db_manager.conn, operation, target_path)
+            if open_run and fresh:
+                db_manager.conn.execute("UPDATE checkpic_runs SET status = 'verworfen', finished_at = CURRENT_TIMESTAMP "
+                                        "WHERE id = ?", (open_run['id'],))
+                db_manager.conn.commit()
+                print(f"Abgebrochener Lauf {open_run['id']} vom {open_run['started_at']} wird verworfen.")
+            elif open_run:
+                print(f"Setze abgebrochenen Lauf {open_run['id']} vom {open_run['started_at']} fort "
+                      f"(--fresh für einen neuen Lauf).")
+                run = open_run
+                return run_journal(db_manager, run, verify, workers)
+
+        # Namensschlüssel auf den aktuellen Stand bringen (Namen können in anderen Programmen geändert worden sein)
+        refresh_name_keys(db_manager.conn)
+
         # Hole alle Einträge mit nicht-leerem src_path, einschließlich der Location-Spalte
-        db_manager.cursor.execute("SELECT id, name, vorname, src_path, feiertag, feieruhrzeit, bestellnummer, location FROM anmeldungen WHERE src_path != '' AND src_path IS NOT NULL")
+        db_manager.cursor.execute("SELECT id, name, vorname, src_path, feiertag, feieruhrzeit, bestellnummer, location, vorname_key, name_key FROM anmeldungen WHERE src_path != '' AND src_path IS NOT NULL")
         entries = db_manager.cursor.fetchall()
-        
+
         if not entries:
             print("Keine Einträge mit src_path gefunden.")
-            return
-        
-        print(f"\nPrüfe {len(entries)} Einträge auf vorhandene Bilder...")
-        
+            return CHECKPIC_DONE
+
+        # Gruppiere die Einträge nach src_path (Reihenfolge des ersten Auftretens)
+        groups = OrderedDict()
+        for entry in entries:
+            groups.setdefault(entry['src_path'], []).append(entry)
+
+        print(f"\nPrüfe {len(entries)} Einträge in {len(groups)} Quellverzeichnissen auf vorhandene Bilder...")
+
         # Zähler für gefundene und nicht gefundene Bilder
         found_count = 0
         not_found_count = 0
-        
-        # Zähler für verschobene/kopierte und nicht verschobene/kopierte Bilder (für alle Einträge)
-        processed_count = 0
-        not_processed_count = 0
-        
+
+        # Geplante Übertragungen (Eintrags-ID, quelle, ziel, work_path)
+        planned = []
+        planned_dests = set()
+        planned_sources = set()
+        duplicate_count = 0
+
+        # Bilder, die zu mehreren Einträgen passen (werden jedem davon zugeordnet)
+        ambiguous_count = 0
+
+        # Unscharfe Treffer (eindeutig und zugeordnet / mehrdeutig und nicht zugeordnet)
+        fuzzy_count = 0
+        fuzzy_ambiguous_count = 0
+
+        # Nicht zugeordnete Bilder für den Bericht: (Bildpfad, Liste der (feiertag, location) der Gruppe)
+        unassigned_images = []
+
         # Bestimme die Operation (verschieben oder kopieren)
         is_move_operation = operation == 'move'
-        
-        # Bildendungen
-        image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff', '.jfif', '.psd']
-        
-        # Iteriere über alle Einträge
-        for entry_id, name, vorname, src_path, feiertag, feieruhrzeit, bestellnummer, location in entries:
+
+        # Iteriere über alle Quellverzeichnisse
+        for src_path, group_entries in groups.items():
             # Prüfe, ob das Verzeichnis existiert
             if not os.path.exists(src_path):
-                print(f"Verzeichnis nicht gefunden: ID {entry_id}, {vorname} {name}, Pfad: {src_path}")
-                not_found_count += 1
+                for entry_id, name, vorname, *_ in group_entries:
+                    print(f"Verzeichnis nicht gefunden: ID {entry_id}, {vorname} {name}, Pfad: {src_path}")
+                not_found_count += len(group_entries)
                 continue
-            
-            # Suche nach Bildern im Verzeichnis
-            found_images = []
+
+            # Durchlaufe das Verzeichnis einmal und ordne jedes Bild in einem Durchgang zu
             try:
-                # Vorbereitung der Suchbegriffe
-                # Teile den Vornamen in einzelne Vornamen auf (falls mehrere vorhanden sind)
-                vornamen = [v.strip() for v in vorname.split() if v.strip()]
-                
-                # Erstelle alternative Schreibweisen für Umlaute
-                name_variants = [name]
-                vorname_variants = []
-                
-                # Für jeden Vornamen alternative Schreibweisen erstellen
-                for v in vornamen:
-                    variants = [v]
-                    # Umlaute-Ersetzungen
-                    if 'ä' in v.lower():
-                        variants.append(v.lower().replace('ä', 'ae').title())
-                    if 'ö' in v.lower():
-                        variants.append(v.lower().replace('ö', 'oe').title())
-                    if 'ü' in v.lower():
-                        variants.append(v.lower().replace('ü', 'ue').title())
-                    if 'ß' in v.lower():
-                        variants.append(v.lower().replace('ß', 'ss').title())
-                    vorname_variants.append(variants)
-                
-                # Auch für den Nachnamen alternative Schreibweisen erstellen
-                # Von Umlaut zu Umschreibung
-                if 'ä' in name.lower():
-                    name_variants.append(name.lower().replace('ä', 'ae').title())
-                if 'ö' in name.lower():
-                    name_variants.append(name.lower().replace('ö', 'oe').title())
-                if 'ü' in name.lower():
-                    name_variants.append(name.lower().replace('ü', 'ue').title())
-                if 'ß' in name.lower():
-                    name_variants.append(name.lower().replace('ß', 'ss').title())
-                
-                # Von Umschreibung zu Umlaut (umgekehrte Richtung)
-                if 'ae' in name.lower():
-                    name_variants.append(name.lower().replace('ae', 'ä').title())
-                if 'oe' in name.lower():
-                    name_variants.append(name.lower().replace('oe', 'ö').title())
-                if 'ue' in name.lower():
-                    name_variants.append(name.lower().replace('ue', 'ü').title())
-                if 'ss' in name.lower():
-                    name_variants.append(name.lower().replace('ss', 'ß').title())
-                    
-                # Spezialfall: uess -> üß (wie in Schüßler -> Schuessler)
-                if 'uess' in name.lower():
-                    name_variants.append(name.lower().replace('uess', 'üß').title())
-                
-                # Spezialfall: üß -> uess (wie in Schüßler -> Schuessler)
-                if 'üß' in name.lower():
-                    name_variants.append(name.lower().replace('üß', 'uess').title())
-                # Auch ü und ß einzeln berücksichtigen
-                if 'ü' in name.lower() and 'ß' in name.lower():
-                    temp = name.lower().replace('ü', 'ue')
-                    name_variants.append(temp.replace('ß', 'ss').title())
-                
-                
-                for root, _, files in os.walk(src_path):
-                    for file in files:
-                        file_lower = file.lower()
-                        # Prüfe, ob es sich um ein Bild handelt
-                        if any(file_lower.endswith(ext) for ext in image_extensions):
-                            # Prüfe, ob der Dateiname mit einem der Vornamen beginnt und den Nachnamen enthält
-                            match_found = False
-                            
-                            # Prüfe alle Vornamen-Varianten
-                            for vorname_list in vorname_variants:
-                                for v in vorname_list:
-                                    # Prüfe alle Nachnamen-Varianten
-                                    for n in name_variants:
-                                        # Prüfe, ob der Dateiname mit dem Vornamen beginnt und den Nachnamen enthält
-                                        if file_lower.startswith(v.lower()) and n.lower() in file_lower:
-                                            # Debug-Ausgabe für Schüßler
-                                            if 'schüßler' in n.lower() or 'schuessler' in n.lower() or 'schüßler' in file_lower or 'schuessler' in file_lower:
-                                                print(f"DEBUG: Datei gefunden: {file_lower}")
-                                                print(f"DEBUG: Vorname: {v.lower()}, Nachname: {n.lower()}")
-                                            found_images.append(os.path.join(root, file))
-                                            match_found = True
-                                            break
-                                    if match_found:
-                                        break
-                                if match_found:
-                                    break
+                images = scan_source_tree(src_path)
+                group_images, ambiguous, fuzzy_matches = match_group_images(images, group_entries, fuzzy)
             except Exception as e:
                 print(f"Fehler beim Durchsuchen des Verzeichnisses {src_path}: {e}")
                 continue
-            
-            # Wenn Bilder gefunden wurden
-            if found_images:
-                print(f"Gefunden: ID {entry_id}, {vorname} {name}, {len(found_images)} Bilder")
-                found_count += 1
-                
-                # Zähler für die Bilder dieses Eintrags zurücksetzen
-                entry_processed_count = 0
-                
-                # Wenn target_path angegeben ist, verschiebe oder kopiere die Bilder
-                if target_path:
-                    # Erstelle die Verzeichnisstruktur
-                    # Feiertag_Location/Feieruhrzeit/Vorname_Nachname_Bestellnummer
-                    
-                    # Bereinige die Location (falls vorhanden) für die Verwendung im Verzeichnisnamen
-                    location_clean = location.replace('/', '-').replace('\\', '-') if location else ""
-                    
-                    # Erstelle den Feiertag-Verzeichnisnamen mit Location
-                    if feiertag and location_clean:
-                        feiertag_dir = f"{feiertag.replace('/', '-').replace('\\', '-')}_{location_clean}"
-                    else:
-                        feiertag_dir = feiertag.replace('/', '-').replace('\\', '-') if feiertag else "Unbekannt"
-                    feieruhrzeit_dir = feieruhrzeit.replace('/', '-').replace('\\', '-') if feieruhrzeit else "Unbekannt"
-                    person_dir = f"{vorname}_{name}_{bestellnummer}".replace('/', '-').replace('\\', '-')
-                    
-                    # Erstelle den vollständigen Zielpfad
-                    target_dir = os.path.join(target_path, feiertag_dir, feieruhrzeit_dir, person_dir)
-                    
-                    # Stelle sicher, dass das Zielverzeichnis existiert
-                    os.makedirs(target_dir, exist_ok=True)
-                    
-                    # Erstelle den relativen Pfad für work_path (relativ zum move_path)
-                    rel_path = os.path.join(feiertag_dir, feieruhrzeit_dir, person_dir)
-                    
-                    # Erstelle den vollständigen Pfad für work_path
-                    full_path = os.path.abspath(target_dir)
-                    
-                    # Verschiebe die Bilder
-                    for image_path in found_images:
-                        try:
-                            # Extrahiere den Dateinamen aus dem Pfad
-                            image_name = os.path.basename(image_path)
-                            # Erstelle den Zielpfad für das Bild
-                            dest_path = os.path.join(target_dir, image_name)
-                            
-                            # Verschiebe oder kopiere das Bild
-                            if is_move_operation:
-                                shutil.move(image_path, dest_path)  # Verschiebe das Bild (Original wird entfernt)
-                                print(f"  Bild verschoben: {image_name} -> {target_dir}")
-                            else:
-                                shutil.copy2(image_path, dest_path)  # Kopiere das Bild (Original bleibt erhalten)
-                                print(f"  Bild kopiert: {image_name} -> {target_dir}")
-                            processed_count += 1
-                            entry_processed_count += 1
-                            
-                            # Setze das work_path in der Datenbank, wenn es das erste Bild dieses Eintrags ist
-                            if entry_processed_count == 1:
-                                try:
-                                    db_manager.cursor.execute("UPDATE anmeldungen SET work_path = ? WHERE id = ?", (full_path, entry_id))
-                                    db_manager.conn.commit()
-                                    print(f"  Work_path in Datenbank aktualisiert: {full_path}")
-                                except Exception as e:
-                                    print(f"  Fehler beim Aktualisieren des work_path in der Datenbank: {e}")
-                        except Exception as e:
-                            print(f"  Fehler beim Kopieren von {image_path}: {e}")
-                            not_processed_count += 1
-            else:
-                print(f"Keine Bilder gefunden: ID {entry_id}, {vorname} {name}")
-                not_found_count += 1
-        
+
+            entry_names = {entry['id']: f"{entry['vorname']} {entry['name']}" for entry in group_entries}
+            for image_path, entry_ids in ambiguous:
+                candidates = ", ".join(f"ID {entry_id} ({entry_names[entry_id]})" for entry_id in entry_ids)
+                print(f"Mehrdeutig: {os.path.relpath(image_path, src_path)} passt zu {candidates}")
+            ambiguous_count += len(ambiguous)
+
+            if report:
+                assigned = set().union(*group_images.values())
+                pool_keys = sorted({(entry['feiertag'], entry['location']) for entry in group_entries},
+                                   key=lambda key: tuple(value or '' for value in key))
+                unassigned_images.extend((image_path, pool_keys) for image_path, _ in images
+                                         if image_path not in assigned)
+
+            fuzzy_images = set()
+            for image_path, entry_ids in fuzzy_matches:
+                candidates = ", ".join(f"ID {entry_id} ({entry_names[entry_id]})" for entry_id in entry_ids)
+                if len(entry_ids) == 1:
+                    print(f"Unscharf: {os.path.relpath(image_path, src_path)} -> {candidates}")
+                    fuzzy_images.add(image_path)
+                    fuzzy_count += 1
+                else:
+                    print(f"Unscharf mehrdeutig (nicht zugeordnet): {os.path.relpath(image_path, src_path)} passt zu {candidates}")
+                    fuzzy_ambiguous_count += 1
+
+            for entry_id, name, vorname, _, feiertag, feieruhrzeit, bestellnummer, location, *_ in group_entries:
+                found_images = group_images[entry_id]
+                # Ein Bild kann nur einmal verschoben werden: es gehört dem ersten passenden Eintrag
+                if is_move_operation:
+                    found_images = [path for path in found_images if path not in planned_sources]
+
+                # Wenn Bilder gefunden wurden
+                if found_images:
+                    entry_fuzzy_count = sum(1 for path in found_images if path in fuzzy_images)
+                    fuzzy_text = f" (davon {entry_fuzzy_count} unscharf)" if entry_fuzzy_count else ""
+                    print(f"Gefunden: ID {entry_id}, {vorname} {name}, {len(found_images)} Bilder{fuzzy_text}")
+                    found_count += 1
+
+                    # Wenn target_path angegeben ist, Übertragung der Bilder planen
+                    if target_path:
+                        target_dir = get_target_dir(target_path, vorname, name, feiertag, feieruhrzeit, bestellnummer, location)
+
+                        # Stelle sicher, dass das Zielverzeichnis existiert
+                        os.makedirs(target_dir, exist_ok=True)
+
+                        # Erstelle den vollständigen Pfad für work_path
+                        full_path = os.path.abspath(target_dir)
+
+                        for image_path in found_images:
+                            dest_path = os.path.join(target_dir, os.path.basename(image_path))
+                            # Gleichnamige Bilder aus verschiedenen Unterordnern würden sich überschreiben
+                            if dest_path in planned_dests:
+                                print(f"  Übersprungen (Dateiname schon vorhanden): {image_path}")
+                                duplicate_count += 1
+                                continue
+                            planned.append((entry_id, image_path, dest_path, full_path))
+                            planned_dests.add(dest_path)
+                            planned_sources.add(image_path)
+                else:
+                    print(f"Keine Bilder gefunden: ID {entry_id}, {vorname} {name}")
+                    not_found_count += 1
+
         print(f"\nErgebnis der Prüfung:")
         print(f"  - {found_count} Einträge mit passenden Bildern gefunden")
         print(f"  - {not_found_count} Einträge ohne passende Bilder")
-        
-        # Wenn target_path angegeben ist, zeige auch die Statistik zum Verschieben/Kopieren an
+        if ambiguous_count:
+            print(f"  - {ambiguous_count} Bilder passen zu mehreren Einträgen (siehe 'Mehrdeutig')")
+        if fuzzy:
+            print(f"  - {fuzzy_count} Bilder unscharf zugeordnet (Editierabstand bis {fuzzy}, siehe 'Unscharf')")
+            print(f"  - {fuzzy_ambiguous_count} Bilder unscharf mehrdeutig und nicht zugeordnet")
+
+        # Bericht der nicht zugeordneten Bilder mit Vorschlägen aus demselben Feiertag und derselben Location
+        if report:
+            db_manager.cursor.execute("SELECT id, vorname, name, feiertag, location, vorname_key, name_key FROM anmeldungen")
+            pool_entries = db_manager.cursor.fetchall()
+            ranked = rank_unassigned_images(unassigned_images, pool_entries, fuzzy)
+            entry_names = {entry['id']: (entry['vorname'], entry['name']) for entry in pool_entries}
+            save_unassigned_report(db_manager.conn, ranked, report, entry_names)
+            with_candidates = sum(1 for *_, candidates in ranked if candidates)
+            print(f"\nBericht der nicht zugeordneten Bilder:")
+            print(f"  - {len(ranked)} Bilder keinem Eintrag zugeordnet, {with_candidates} davon mit Vorschlägen")
+            print(f"  - gespeichert in {report} und in der Tabelle checkpic_unassigned")
+
+        # Wenn target_path angegeben ist, alle geplanten Bilder ins Journal schreiben und parallel übertragen
         if target_path:
-            operation_text = "Verschiebens" if is_move_operation else "Kopierens"
-            success_text = "verschoben" if is_move_operation else "kopiert"
-            print(f"\nErgebnis des {operation_text}:")
-            print(f"  - {processed_count} Bilder erfolgreich {success_text}")
-            print(f"  - {not_processed_count} Bilder konnten nicht {success_text} werden")
-    
+            if duplicate_count:
+                print(f"\n{duplicate_count} Bilder wegen doppelter Dateinamen übersprungen")
+            if not planned:
+                print("\nKeine Bilder zu übertragen.")
+                return CHECKPIC_DONE
+            run_id = start_run(db_manager.conn, operation, target_path, link_mode, planned)
+            run = db_manager.conn.execute("SELECT * FROM checkpic_runs WHERE id = ?", (run_id,)).fetchone()
+            return run_journal(db_manager, run, verify, workers)
+        return CHECKPIC_DONE
+
     except Exception as e:
         print(f"Fehler bei der Prüfung der Bilder: {e}")
         if db_manager.conn:
             db_manager.conn.rollback()
+        if run is not None:
+            print(f"Lauf {run['id']} bleibt im Journal offen, ein erneuter Aufruf mit demselben Ziel setzt ihn fort.")
+        return CHECKPIC_FAILED
     finally:
         db_manager.close()
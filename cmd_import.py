@@ -7,6 +7,7 @@ import os
 import pandas as pd
 import zlib
 from excel_config import update_indices
+from dbv_namekeys import refresh_name_keys
 
 def read_excel_data(file_path):
     """
@@ -221,6 +222,9 @@ def import_excel_data(db_manager, excel_path):
         # Commit die Änderungen
         db_manager.conn.commit()
         
+        # Namensschlüssel für Suche und checkpic berechnen
+        refresh_name_keys(db_manager.conn)
+        
         print(f"Import abgeschlossen: {new_count + updated_count} Datensätze verarbeitet")
         print(f"  - {new_count} neue Datensätze eingefügt")
         print(f"  - {updated_count} bestehende Datensätze übersprungen (keine Änderungen vorgenommen)")
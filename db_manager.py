@@ -17,6 +17,7 @@ from cmd_import import execute_import
 from cmd_stats import execute_stats
 from cmd_checksrc import execute_checksrc
 from cmd_checkpic import execute_checkpic
+from dbv_copyengine import LINK_MODES, DEFAULT_WORKERS
 
 class DatabaseManager:
     def __init__(self, db_path):
@@ -219,6 +220,19 @@ def parse_arguments():
     checkpic_parser.add_argument('--db-file', '-d', required=True, help='Pfad zur SQLite-Datenbankdatei')
     checkpic_parser.add_argument('--move', '-m', help='Wenn angegeben, werden gefundene Bilder in diesen Pfad verschoben')
     checkpic_parser.add_argument('--copy', '-c', help='Wenn angegeben, werden gefundene Bilder in diesen Pfad kopiert')
+    checkpic_parser.add_argument('--fuzzy', type=int, nargs='?', const=2, choices=[1, 2],
+                                 help='Bilder ohne exakten Treffer tippfehlertolerant zuordnen (maximaler Editierabstand, Standard 2)')
+    checkpic_parser.add_argument('--report', nargs='?', const='checkpic_unassigned.csv',
+                                 help='Nicht zugeordnete Bilder mit vorgeschlagenen Einträgen als CSV (Standard checkpic_unassigned.csv) '
+                                      'und in die Tabelle checkpic_unassigned schreiben')
+    checkpic_parser.add_argument('--link', choices=LINK_MODES, default='copy',
+                                 help='Mit --copy: Hardlinks (hard) oder Copy-on-Write-Klone (reflink) statt Kopien, '
+                                      'falls das Dateisystem sie unterstützt (Standard copy)')
+    checkpic_parser.add_argument('--verify', action='store_true', help='Kopien per Prüfsumme mit dem Original vergleichen')
+    checkpic_parser.add_argument('--fresh', action='store_true',
+                                 help='Abgebrochenen Lauf mit demselben Ziel verwerfen und neu suchen statt ihn fortzusetzen')
+    checkpic_parser.add_argument('--workers', '-w', type=int, default=DEFAULT_WORKERS,
+                                 help=f'Parallele Threads für Kopieren/Verschieben (Standard {DEFAULT_WORKERS})')
     
     return parser.parse_args()
 
@@ -255,4 +269,5 @@ if __name__ == "__main__":
         target_path = args.move or args.copy
         operation = 'move' if args.move else 'copy' if args.copy else None
         
-        success, message = execute_checkpic(db_manager, target_path, operation)
+        success, message = execute_checkpic(db_manager, target_path, operation, args.fuzzy, args.report,
+                                            args.link, args.verify, args.workers, args.fresh)
@@ -1,15 +1,30 @@
-from flask import Flask, render_template, request, Response
+from flask import Flask, render_template, stream_template, stream_with_context, request, Response, jsonify, make_response
 import sqlite3
 import os
+import re
 import subprocess
 import datetime
+import hashlib
+import time
+import json
+import queue
+import threading
+import gzip
+import zlib
+import urllib.parse
+import io
+import collections
 from PIL import Image
 import piexif
+from dbv_autoimgcov import process_image, get_encoder_dest_path, RENDER_PROFILES, ENCODER_PROFILES, DEFAULT_ENCODER
+from dbv_copyengine import copy_files
+from dbv_zipstream import stream_zip
+from dbv_namekeys import canonical_key, has_name_key_columns, update_entry_name_keys, refresh_name_keys
 
 def get_image_info(file_path):
     """Extract image dimensions and DPI information from an image file"""
     try:
-        if file_path.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp')):
+        if file_path.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp')):
             with Image.open(file_path) as img:
                 width, height = img.size
                 dpi = img.info.get('dpi', (0, 0))
@@ -27,6 +42,13 @@ STATUS_OPTIONS = [
     'Storniert'
 ]
 
+# Formatprüfung für Feiertag (TT.MM.YYYY) und Feieruhrzeit (HH-MM)
+FEIERTAG_PATTERN = r'^(0[1-9]|[12][0-9]|3[01])\.(0[1-9]|1[0-2])\.(19|20)\d\d$'
+FEIERUHRZEIT_PATTERN = r'^([01]?[0-9]|2[0-3])\-([0-5][0-9])$'
+
+# Maximale Anzahl an Parametern pro IN (...)-Abfrage (SQLite-Limit älterer Versionen: 999)
+SQL_IN_CHUNK = 500
+
 app = Flask(__name__)
 DB_PATH = 'anmeldungen.db'  # Standard, kann per ?db=... überschrieben werden
 TABLE = 'anmeldungen'
@@ -43,6 +65,194 @@ def get_db_connection(db_path):
     except sqlite3.Error:
         return None
 
+# Wird in jedes ETag eingerechnet, damit nach einem Neustart (neue Templates) nichts Veraltetes ausgeliefert wird
+ETAG_SALT = str(time.time_ns())
+
+# Zwischenspeicher (db, entry_id) -> (db_signature, work_path) für bedingte Anfragen auf /details
+_details_work_paths = {}
+
+def prepare_name_keys(db_path):
+    """
+    Migriert die Datenbank für die Namensschlüssel und gleicht sie ab; einmal beim Start statt in einer Anfrage.
+
+    Weitere Datenbanken (?db=...) werden nicht verändert; ohne Schlüsselspalten sucht die Startseite nur
+    in den Namen selbst (checkpic oder import legen die Spalten an).
+    """
+    conn = get_db_connection(db_path)
+    if conn is None:
+        return
+    try:
+        updated = refresh_name_keys(conn)
+        if updated:
+            print(f"Namensschlüssel für {updated} Einträge aktualisiert")
+    except sqlite3.Error as e:
+        print(f"Namensschlüssel konnten nicht aktualisiert werden: {e}")
+    finally:
+        conn.close()
+
+def get_db_signature(db_path):
+    """Günstige Versionskennung der Datenbank aus Größe und Änderungszeit der Datei (inkl. WAL-Datei)"""
+    parts = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            st = os.stat(path)
+            parts.append(f"{st.st_mtime_ns}-{st.st_size}")
+        except OSError:
+            parts.append("0")
+    return ":".join(parts)
+
+def get_dir_signature(dir_path):
+    """
+    Änderungszeit eines Verzeichnisses (ändert sich beim Anlegen, Löschen oder Umbenennen von Dateien).
+
+    Wer eine Datei an Ort und Stelle überschreibt, ruft touch_dir() auf, damit die Kennung sich ändert.
+    """
+    try:
+        return str(os.stat(dir_path).st_mtime_ns) if dir_path else "0"
+    except OSError:
+        return "0"
+
+def touch_dir(file_path):
+    """Setzt die Änderungszeit des Verzeichnisses einer überschriebenen Datei, damit das ETag der Detailseite ungültig wird"""
+    try:
+        os.utime(os.path.dirname(file_path) or ".")
+    except OSError:
+        pass
+
+def make_etag(*parts):
+    """Erzeugt ein ETag aus den übergebenen Bestandteilen"""
+    return hashlib.sha1("|".join(str(p) for p in (ETAG_SALT,) + parts).encode("utf-8")).hexdigest()
+
+def etag_matches(etag):
+    """Prüft If-None-Match gegen das ETag (auch in der gzip-Variante)"""
+    return request.if_none_match.contains(etag) or request.if_none_match.contains(etag + "-gz")
+
+def not_modified(etag):
+    """Antwort 304 ohne Inhalt, mit der ETag-Variante (gzip oder nicht), die der Client gesendet hat"""
+    response = Response(status=304)
+    if request.if_none_match.contains(etag + "-gz") and "gzip" in request.accept_encodings:
+        etag += "-gz"
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def with_etag(body, etag):
+    """Hängt ETag und Cache-Control an eine Antwort, damit der Browser beim nächsten Mal nachfragt"""
+    response = make_response(body)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+# Abonnenten des Server-Sent-Events-Kanals /events (eine Queue pro offener Seite)
+_event_subscribers = []
+_event_lock = threading.Lock()
+EVENT_QUEUE_SIZE = 100      # Ereignisse pro Abonnent, bevor weitere verworfen werden
+EVENT_KEEPALIVE = 15        # Sekunden bis zum Keepalive-Kommentar
+
+def publish_event(event_type, db, entry_ids, **data):
+    """Verteilt ein Änderungsereignis (entry/file) an alle offenen /events-Verbindungen"""
+    event = {
+        "type": event_type,
+        "db": os.path.abspath(db),
+        "entry_ids": [int(e) for e in entry_ids if str(e).isdigit()],
+        **data
+    }
+    with _event_lock:
+        subscribers = list(_event_subscribers)
+    for subscriber in subscribers:
+        try:
+            subscriber.put_nowait(event)
+        except queue.Full:
+            pass
+
+def wants_json():
+    """True, wenn der Aufrufer (fetch aus der Galerie) JSON statt einer HTML-Seite erwartet"""
+    return request.accept_mimetypes.best == "application/json"
+
+def get_request_entry_id():
+    """Eintrags-ID aus dem Parameter entry_id, ersatzweise aus dem Referrer (/details/<id>)"""
+    if request.args.get("entry_id"):
+        return request.args.get("entry_id")
+    return request.referrer.split("/")[-1].split("?")[0] if request.referrer else ""
+
+def get_file_info(work_path, f):
+    """Zeile der Dateitabelle auf der Detailseite"""
+    file_size = round(os.path.getsize(os.path.join(work_path, f))/1024, 1)
+    width, height, dpi_x, dpi_y = get_image_info(os.path.join(work_path, f))
+    return {
+        'name': os.path.basename(f),
+        'size': file_size,
+        'width': width if width else '-',
+        'height': height if height else '-',
+        'dpi_x': dpi_x if dpi_x else '-',
+        'dpi_y': dpi_y if dpi_y else '-'
+    }
+
+# Komprimierung der Antworten (per Accept-Encoding ausgehandelt)
+GZIP_MIMETYPES = ("text/html", "application/json")
+GZIP_MIN_SIZE = 500         # Kleinere Antworten werden unkomprimiert gesendet
+GZIP_LEVEL = 6
+STREAM_CHUNK_SIZE = 16384   # Puffergröße für gestreamte Templates
+
+# Übersicht gestreamt rendern (False: komplett im Speicher rendern, z.B. für Vergleichsmessungen)
+STREAM_INDEX = True
+
+# Parallele Kopier-Threads für den Export der finalen Bilder
+COPY_WORKERS = 8
+
+def buffered_stream(chunks, chunk_size=STREAM_CHUNK_SIZE):
+    """Fasst die vielen kleinen Template-Stücke zu größeren Blöcken zusammen; der erste Block geht sofort raus"""
+    buffer = []
+    size = 0
+    first = True
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if first or size >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+            first = False
+    if buffer:
+        yield "".join(buffer)
+
+def gzip_stream(chunks):
+    """Komprimiert eine gestreamte Antwort blockweise; jeder Block wird sofort an den Client geleert"""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = gzip-Format
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.after_request
+def compress_response(response):
+    """gzip für HTML und JSON, wenn der Client es anbietet"""
+    if response.mimetype not in GZIP_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+    if (response.status_code != 200 or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or "gzip" not in request.accept_encodings):
+        return response
+    
+    if response.is_streamed:
+        response.response = gzip_stream(response.response)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < GZIP_MIN_SIZE:
+            return response
+        response.set_data(gzip.compress(data, GZIP_LEVEL))
+    
+    response.headers["Content-Encoding"] = "gzip"
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag + "-gz", weak)
+    return response
+
 @app.route("/")
 def index():
     db = request.args.get("db") or DB_PATH
@@ -52,6 +262,11 @@ def index():
     feieruhrzeit = request.args.get("feieruhrzeit", "")
     has_images = request.args.get("has_images", "")
     
+    # Bedingte Anfrage: unveränderte Datenbank -> 304 ohne Abfragen und Rendern
+    etag = make_etag("index", db, get_db_signature(db), request.query_string)
+    if etag_matches(etag):
+        return not_modified(etag)
+    
     # Prüfen, ob die Datenbank existiert
     conn = get_db_connection(db)
     if conn is None:
@@ -86,8 +301,15 @@ def index():
         params = []
         where = []
         if q:
-            where.append("(bestellnummer LIKE ? OR name LIKE ? OR vorname LIKE ? OR hint LIKE ?)")
+            search = ["bestellnummer LIKE ?", "name LIKE ?", "vorname LIKE ?", "hint LIKE ?"]
             params.extend([f"%{q}%"] * 4)
+            # Über die Namensschlüssel findet "Schuessler" auch "Schüßler" und "anna-maria" auch "Anna Maria"
+            q_key = canonical_key(q)
+            if q_key and has_name_key_columns(conn):
+                search.append("replace(vorname_key || name_key, ' ', '') LIKE ?")
+                search.append("replace(name_key || vorname_key, ' ', '') LIKE ?")
+                params.extend([f"%{q_key}%"] * 2)
+            where.append("(" + " OR ".join(search) + ")")
         if status:
             where.append("status = ?")
             params.append(status)
@@ -122,8 +344,7 @@ def index():
             db=db,
             db_error=f"Fehler beim Zugriff auf die Tabelle '{TABLE}' in der Datenbank '{db}'."
         )
-    return render_template(
-        "index.html",
+    context = dict(
         rows=rows,
         q=q,
         status=status,
@@ -133,14 +354,32 @@ def index():
         feieruhrzeit=feieruhrzeit,
         feieruhrzeit_options=feieruhrzeit_options,
         has_images=has_images,
+        bulk_status_options=STATUS_OPTIONS,
         db=db
     )
+    if not STREAM_INDEX:
+        return with_etag(render_template("index.html", **context), etag)
+    
+    # Bei tausenden Zeilen gehen die ersten Bytes raus, bevor die Tabelle fertig gerendert ist
+    return with_etag(Response(stream_with_context(buffered_stream(stream_template("index.html", **context))),
+                              mimetype="text/html"), etag)
 
 @app.route("/details/<int:entry_id>", methods=["GET", "POST"])
 def details(entry_id):
     db = request.args.get("db") or DB_PATH
     full_size = request.args.get("full_size") == "1"
     
+    # Bedingte Anfrage: ist der work_path bekannt und die Datenbank unverändert, reichen je ein stat()
+    # auf Datenbank und Verzeichnis für die Entscheidung über 304 (überschreibende Routen rufen touch_dir auf)
+    db_signature = get_db_signature(db)
+    etag = None
+    if request.method == "GET":
+        cached = _details_work_paths.get((db, entry_id))
+        if cached and cached[0] == db_signature:
+            etag = make_etag("details", db, entry_id, db_signature, get_dir_signature(cached[1]), request.query_string)
+            if etag_matches(etag):
+                return not_modified(etag)
+    
     # Prüfen, ob die Datenbank existiert
     conn = get_db_connection(db)
     if conn is None:
@@ -156,24 +395,31 @@ def details(entry_id):
     except sqlite3.Error as e:
         return f'<h2>Fehler beim Zugriff auf die Tabelle "{TABLE}" in der Datenbank "{db}".</h2>', 404
     
+    if request.method == "GET":
+        _details_work_paths[(db, entry_id)] = (db_signature, row["work_path"])
+        etag = make_etag("details", db, entry_id, db_signature, get_dir_signature(row["work_path"]), request.query_string)
+        if etag_matches(etag):
+            return not_modified(etag)
+    
     # Felder extrahieren
-    bestellnummer = row[1]
-    vorname = row[3]
-    name = row[2]
-    uid = row[4]
-    feiertag = row[5]
-    feieruhrzeit = row[6]
-    location = row[7]
-    hint = row[8]
-    src_path = row[9]
-    work_path = row[10]
-    
-    final_picture_1 = row[11]
-    final_picture_2 = row[12]
-    final_picture_3 = row[13]
-    status = row[14]
-    created_at = row[15]
-    updated_at = row[16]
+    # Über den Spaltennamen, da die Spaltenreihenfolge je nach Alter der Datenbank abweicht
+    bestellnummer = row["bestellnummer"]
+    vorname = row["vorname"]
+    name = row["name"]
+    uid = row["uid"]
+    feiertag = row["feiertag"]
+    feieruhrzeit = row["feieruhrzeit"]
+    location = row["location"]
+    hint = row["hint"]
+    src_path = row["src_path"]
+    work_path = row["work_path"]
+    
+    final_picture_1 = row["final_picture_1"]
+    final_picture_2 = row["final_picture_2"]
+    final_picture_3 = row["final_picture_3"]
+    status = row["status"]
+    created_at = row["created_at"]
+    updated_at = row["updated_at"]
     
     # Wenn POST-Request, Daten aktualisieren
     if request.method == "POST":
@@ -187,11 +433,10 @@ def details(entry_id):
         new_feieruhrzeit = request.form.get("feieruhrzeit", feieruhrzeit)
         
         # Validierung für Feiertag (TT.MM.YYYY)
-        import re
-        feiertag_valid = re.match(r'^(0[1-9]|[12][0-9]|3[01])\.(0[1-9]|1[0-2])\.(19|20)\d\d$', new_feiertag) is not None if new_feiertag else True
+        feiertag_valid = re.match(FEIERTAG_PATTERN, new_feiertag) is not None if new_feiertag else True
         
         # Validierung für Feieruhrzeit (HH-MM)
-        feieruhrzeit_valid = re.match(r'^([01]?[0-9]|2[0-3])\-([0-5][0-9])$', new_feieruhrzeit) is not None if new_feieruhrzeit else True
+        feieruhrzeit_valid = re.match(FEIERUHRZEIT_PATTERN, new_feieruhrzeit) is not None if new_feieruhrzeit else True
         
         # Finale Bilder aus dem Formular extrahieren
         new_final_picture_1 = request.form.get("final_picture_1", "")
@@ -219,8 +464,10 @@ def details(entry_id):
                 cur = conn.cursor()
                 cur.execute(f"UPDATE {TABLE} SET vorname = ?, name = ?, hint = ?, status = ?, feiertag = ?, feieruhrzeit = ?, final_picture_1 = ?, final_picture_2 = ?, final_picture_3 = ? WHERE id = ?", 
                            (vorname, name, hint, status, feiertag, feieruhrzeit, final_picture_1, final_picture_2, final_picture_3, entry_id))
+                update_entry_name_keys(conn, entry_id, vorname, name)
                 conn.commit()
                 conn.close()
+                publish_event("entry", db, [entry_id], action="updated")
         else:
             # Fehlermeldung setzen (wird später im HTML angezeigt)
             error_msg = ""
@@ -241,27 +488,17 @@ def details(entry_id):
         # Dateien für die Tabelle vorbereiten
         for f in os.listdir(work_path):
             if os.path.isfile(os.path.join(work_path, f)):
-                file_size = round(os.path.getsize(os.path.join(work_path, f))/1024, 1)
-                width, height, dpi_x, dpi_y = get_image_info(os.path.join(work_path, f))
-                
-                files.append({
-                    'name': os.path.basename(f),
-                    'size': file_size,
-                    'width': width if width else '-',
-                    'height': height if height else '-',
-                    'dpi_x': dpi_x if dpi_x else '-',
-                    'dpi_y': dpi_y if dpi_y else '-'
-                })
+                files.append(get_file_info(work_path, f))
                 
                 # Bilder für die Galerie sammeln
-                if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.psd')):
+                if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.psd')):
                     image_files.append(f)
     
     # Status-Optionen importieren
     global STATUS_OPTIONS
     
     # Template rendern
-    return render_template(
+    body = render_template(
         "details.html",
         entry_id=entry_id,
         bestellnummer=bestellnummer,
@@ -281,12 +518,113 @@ def details(entry_id):
         created_at=created_at,
         updated_at=updated_at,
         status_options=STATUS_OPTIONS,
+        encoder_options=list(ENCODER_PROFILES),
+        default_encoder=DEFAULT_ENCODER,
         image_files=image_files,
         files=files,
         file_count=file_count,
         full_size=full_size,
         db=db
     )
+    return with_etag(body, etag) if etag else body
+
+@app.route("/bulk_update", methods=["POST"])
+def bulk_update():
+    """Status, Hinweis, Feiertag oder Feieruhrzeit für viele Einträge in einer Transaktion ändern"""
+    db = request.args.get("db") or request.form.get("db") or DB_PATH
+
+    # IDs aus dem Formular (Mehrfachauswahl) oder als kommagetrennte Liste
+    raw_ids = request.form.getlist("ids")
+    if len(raw_ids) == 1 and "," in raw_ids[0]:
+        raw_ids = raw_ids[0].split(",")
+
+    entry_ids = []
+    for raw_id in raw_ids:
+        raw_id = raw_id.strip()
+        if not raw_id:
+            continue
+        if not raw_id.isdigit():
+            return jsonify({"success": False, "error": f"Ungültige ID: {raw_id}"}), 400
+        if int(raw_id) not in entry_ids:
+            entry_ids.append(int(raw_id))
+
+    if not entry_ids:
+        return jsonify({"success": False, "error": "Keine Einträge ausgewählt."}), 400
+
+    # Zu ändernde Felder (leere Felder bleiben unverändert)
+    status = request.form.get("status", "").strip()
+    hint_append = request.form.get("hint_append", "").strip()
+    feiertag = request.form.get("feiertag", "").strip()
+    feieruhrzeit = request.form.get("feieruhrzeit", "").strip()
+
+    # Validierung vor jeder Änderung, damit nie nur ein Teil geschrieben wird
+    errors = []
+    if status and status not in STATUS_OPTIONS:
+        errors.append(f"Unbekannter Status: {status}")
+    if feiertag and re.match(FEIERTAG_PATTERN, feiertag) is None:
+        errors.append("Feiertag muss im Format TT.MM.YYYY sein.")
+    if feieruhrzeit and re.match(FEIERUHRZEIT_PATTERN, feieruhrzeit) is None:
+        errors.append("Feieruhrzeit muss im Format HH-MM sein.")
+    if not (status or hint_append or feiertag or feieruhrzeit):
+        errors.append("Keine Änderung angegeben.")
+    if errors:
+        return jsonify({"success": False, "error": " ".join(errors)}), 400
+
+    # SET-Klausel aus den angegebenen Feldern zusammensetzen
+    set_parts = []
+    set_params = []
+    if status:
+        set_parts.append("status = ?")
+        set_params.append(status)
+    if hint_append:
+        set_parts.append("hint = CASE WHEN hint IS NULL OR hint = '' THEN ? ELSE hint || char(10) || ? END")
+        set_params.extend([hint_append, hint_append])
+    if feiertag:
+        set_parts.append("feiertag = ?")
+        set_params.append(feiertag)
+    if feieruhrzeit:
+        set_parts.append("feieruhrzeit = ?")
+        set_params.append(feieruhrzeit)
+
+    conn = get_db_connection(db)
+    if conn is None:
+        return jsonify({"success": False, "error": f"Die Datenbank '{db}' wurde nicht gefunden oder konnte nicht geöffnet werden."}), 404
+
+    results = {}
+    try:
+        cur = conn.cursor()
+
+        # Vorhandene IDs in Blöcken ermitteln
+        existing_ids = set()
+        for start in range(0, len(entry_ids), SQL_IN_CHUNK):
+            chunk = entry_ids[start:start + SQL_IN_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            cur.execute(f"SELECT id FROM {TABLE} WHERE id IN ({placeholders})", chunk)
+            existing_ids.update(row[0] for row in cur.fetchall())
+
+        update_ids = [entry_id for entry_id in entry_ids if entry_id in existing_ids]
+
+        # Alle Änderungen in einer Transaktion schreiben
+        with conn:
+            cur.executemany(f"UPDATE {TABLE} SET {', '.join(set_parts)} WHERE id = ?",
+                            [set_params + [entry_id] for entry_id in update_ids])
+
+        for entry_id in entry_ids:
+            results[entry_id] = "aktualisiert" if entry_id in existing_ids else "nicht gefunden"
+    except sqlite3.Error as e:
+        return jsonify({"success": False, "error": f"Datenbankfehler, keine Änderungen gespeichert: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+    if update_ids:
+        publish_event("entry", db, update_ids, action="updated")
+
+    return jsonify({
+        "success": True,
+        "updated": len(update_ids),
+        "not_found": len(entry_ids) - len(update_ids),
+        "results": [{"id": entry_id, "result": result} for entry_id, result in results.items()]
+    })
 
 @app.route("/image/<int:entry_id>/<path:filename>")
 def serve_image(entry_id, filename):
@@ -324,6 +662,8 @@ def serve_image(entry_id, filename):
         content_type = "image/gif"
     elif filename.lower().endswith(".bmp"):
         content_type = "image/bmp"
+    elif filename.lower().endswith(".webp"):
+        content_type = "image/webp"
     
     # Read and return the image file
     with open(image_path, "rb") as f:
@@ -338,10 +678,20 @@ def convert_image():
         source_file = request.form.get("source_file")
         destination_file = request.form.get("destination_file")
         text = request.form.get("text")
+        profile = request.form.get("profile")
+        encoder = request.form.get("encoder")
     else:  # GET
         source_file = request.args.get("source_file")
         destination_file = request.args.get("destination_file")
         text = request.args.get("text")
+        profile = request.args.get("profile")
+        encoder = request.args.get("encoder")
+    
+    # Encoder-Profile mit festem Format (z.B. webp) bestimmen die Dateiendung des Ziels
+    if encoder in ENCODER_PROFILES:
+        destination_file = get_encoder_dest_path(destination_file, encoder)
+    else:
+        encoder = None
     
     # Überprüfen, ob die Quelldatei existiert
     if not os.path.exists(source_file) or not os.path.isfile(source_file):
@@ -364,6 +714,10 @@ def convert_image():
                "--source-file", source_file, 
                "--destination-file", destination_file, 
                "--text", text]
+        if profile in RENDER_PROFILES:
+            cmd += ["--profile", profile]
+        if encoder:
+            cmd += ["--encoder", encoder]
         
         print(f"Ausgeführter Befehl: {' '.join(cmd)}")
         
@@ -375,10 +729,17 @@ def convert_image():
         print("==== BILDKONVERTIERUNG BEENDET ====")
         
         if result.returncode == 0:
+            touch_dir(destination_file)
+            
             # Zurück zur Detailseite mit einer Erfolgsmeldung
-            entry_id = request.referrer.split("/")[-1].split("?")[0] if request.referrer else ""
+            entry_id = get_request_entry_id()
             db = request.args.get("db") or DB_PATH
             
+            # Offene Seiten per SSE benachrichtigen, statt sie neu laden zu lassen
+            publish_event("file", db, [entry_id], action="converted", file=os.path.basename(destination_file))
+            if wants_json():
+                return jsonify({"success": True, "action": "converted", "file": os.path.basename(destination_file)})
+            
             # Direkt zur Detailseite zurückkehren
             return f"""<html>
                     <head>
@@ -393,6 +754,8 @@ def convert_image():
                 </html>"""
         else:
             # Fehler anzeigen
+            if wants_json():
+                return jsonify({"success": False, "error": result.stderr}), 500
             return f"""<html>
                     <head>
                         <style>body {{ font-family: sans-serif; text-align: center; margin-top: 50px; }}</style>
@@ -404,6 +767,8 @@ def convert_image():
                     </body>
                 </html>"""
     except Exception as e:
+        if wants_json():
+            return jsonify({"success": False, "error": str(e)}), 500
         return f"""<html>
                 <head>
                     <style>body {{ font-family: sans-serif; text-align: center; margin-top: 50px; }}</style>
@@ -415,6 +780,61 @@ def convert_image():
                 </body>
             </html>"""
 
+# Vorschau-Renderings im Speicher: (quelle, mtime_ns, text, profil) -> JPEG-Bytes
+PREVIEW_PROFILE = '720p'
+PREVIEW_CACHE_SIZE = 64
+PREVIEW_QUALITY = 85
+_preview_cache = collections.OrderedDict()
+_preview_lock = threading.Lock()
+
+def render_preview(source_file, mtime_ns, text, profile):
+    """Rendert ein Bild mit Namen nur im Speicher, zwischengespeichert nach Quelle, Änderungszeit, Text und Profil"""
+    key = (source_file, mtime_ns, text, profile)
+    with _preview_lock:
+        if key in _preview_cache:
+            _preview_cache.move_to_end(key)
+            return _preview_cache[key]
+    
+    image = process_image(source_file, text, profile=profile)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=PREVIEW_QUALITY)
+    image.close()
+    data = buffer.getvalue()
+    
+    with _preview_lock:
+        _preview_cache[key] = data
+        while len(_preview_cache) > PREVIEW_CACHE_SIZE:
+            _preview_cache.popitem(last=False)
+    return data
+
+@app.route("/preview_image")
+def preview_image():
+    """Vorschau der Konvertierung (Standard 720p), ohne Dateien zu schreiben"""
+    source_file = request.args.get("source_file", "")
+    text = request.args.get("text", "")
+    profile = request.args.get("profile") or PREVIEW_PROFILE
+    
+    if profile not in RENDER_PROFILES:
+        return f"Unbekanntes Profil: {profile}", 400
+    try:
+        mtime_ns = os.stat(source_file).st_mtime_ns
+    except OSError:
+        return "Image not found", 404
+    
+    etag = make_etag("preview", source_file, mtime_ns, text, profile)
+    if etag_matches(etag):
+        return not_modified(etag)
+    
+    try:
+        data = render_preview(source_file, mtime_ns, text, profile)
+    except Exception as e:
+        return f"Fehler bei der Vorschau: {e}", 500
+    
+    response = Response(data, mimetype="image/jpeg")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
 @app.route("/delete_image")
 def delete_image():
     file_path = request.args.get("file")
@@ -435,9 +855,14 @@ def delete_image():
         print("==== BILD LÖSCHEN BEENDET ====")
         
         # Zurück zur Detailseite
-        entry_id = request.referrer.split("/")[-1].split("?")[0] if request.referrer else ""
+        entry_id = get_request_entry_id()
         db = request.args.get("db") or DB_PATH
         
+        # Offene Seiten per SSE benachrichtigen, statt sie neu laden zu lassen
+        publish_event("file", db, [entry_id], action="deleted", file=os.path.basename(file_path))
+        if wants_json():
+            return jsonify({"success": True, "action": "deleted", "file": os.path.basename(file_path)})
+        
         # Direkt zur Detailseite zurückkehren
         return f"""<html>
                 <head>
@@ -451,6 +876,8 @@ def delete_image():
                 </body>
             </html>"""
     except Exception as e:
+        if wants_json():
+            return jsonify({"success": False, "error": str(e)}), 500
         return f"""<html>
                 <head>
                     <style>body {{ font-family: sans-serif; text-align: center; margin-top: 50px; }}</style>
@@ -490,10 +917,18 @@ def rotate_image():
         print("==== BILD ROTATION BEENDET ====")
         
         if result.returncode == 0:
+            # Die Datei wird an Ort und Stelle überschrieben
+            touch_dir(file_path)
+            
             # Zurück zur Detailseite
-            entry_id = request.referrer.split("/")[-1].split("?")[0] if request.referrer else ""
+            entry_id = get_request_entry_id()
             db = request.args.get("db") or DB_PATH
             
+            # Offene Seiten per SSE benachrichtigen, statt sie neu laden zu lassen
+            publish_event("file", db, [entry_id], action="rotated", file=os.path.basename(file_path))
+            if wants_json():
+                return jsonify({"success": True, "action": "rotated", "file": os.path.basename(file_path)})
+            
             # Direkt zur Detailseite zurückkehren
             return f"""<html>
                     <head>
@@ -508,6 +943,8 @@ def rotate_image():
                 </html>"""
         else:
             # Fehler anzeigen
+            if wants_json():
+                return jsonify({"success": False, "error": result.stderr}), 500
             return f"""<html>
                     <head>
                         <style>body {{ font-family: sans-serif; text-align: center; margin-top: 50px; }}</style>
@@ -519,6 +956,8 @@ def rotate_image():
                     </body>
                 </html>"""
     except Exception as e:
+        if wants_json():
+            return jsonify({"success": False, "error": str(e)}), 500
         return f"""<html>
                 <head>
                     <style>body {{ font-family: sans-serif; text-align: center; margin-top: 50px; }}</style>
@@ -558,10 +997,17 @@ def convert_psd():
         print("==== PSD KONVERTIERUNG BEENDET ====")
         
         if result.returncode == 0:
+            touch_dir(destination_file)
+            
             # Zurück zur Detailseite
-            entry_id = request.referrer.split("/")[-1].split("?")[0] if request.referrer else ""
+            entry_id = get_request_entry_id()
             db = request.args.get("db") or DB_PATH
             
+            # Offene Seiten per SSE benachrichtigen, statt sie neu laden zu lassen
+            publish_event("file", db, [entry_id], action="converted", file=os.path.basename(destination_file))
+            if wants_json():
+                return jsonify({"success": True, "action": "converted", "file": os.path.basename(destination_file)})
+            
             # Direkt zur Detailseite zurückkehren
             return f"""<html>
                     <head>
@@ -576,6 +1022,8 @@ def convert_psd():
                 </html>"""
         else:
             # Fehler anzeigen
+            if wants_json():
+                return jsonify({"success": False, "error": result.stderr or result.stdout}), 500
             return f"""<html>
                     <head>
                         <style>body {{ font-family: sans-serif; text-align: center; margin-top: 50px; }}</style>
@@ -587,6 +1035,8 @@ def convert_psd():
                     </body>
                 </html>"""
     except Exception as e:
+        if wants_json():
+            return jsonify({"success": False, "error": str(e)}), 500
         return f"""<html>
                 <head>
                     <style>body {{ font-family: sans-serif; text-align: center; margin-top: 50px; }}</style>
@@ -598,6 +1048,136 @@ def convert_psd():
                 </body>
             </html>"""
 
+@app.route("/events")
+def events():
+    """Server-Sent-Events: Änderungen an Einträgen (entry) und Dateien (file) live an die Seiten melden"""
+    db = os.path.abspath(request.args.get("db") or DB_PATH)
+    entry_id = request.args.get("entry_id", type=int)
+    
+    subscriber = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+    with _event_lock:
+        _event_subscribers.append(subscriber)
+    
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = subscriber.get(timeout=EVENT_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event["db"] != db:
+                    continue
+                if entry_id is not None and entry_id not in event["entry_ids"]:
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            with _event_lock:
+                _event_subscribers.remove(subscriber)
+    
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/details/<int:entry_id>/fragment")
+def details_fragment(entry_id):
+    """HTML-Schnipsel (Galerieeintrag und Tabellenzeile) einer einzelnen Datei für Live-Updates"""
+    db = request.args.get("db") or DB_PATH
+    filename = os.path.basename(request.args.get("file", ""))
+    full_size = request.args.get("full_size") == "1"
+    
+    conn = get_db_connection(db)
+    if conn is None:
+        return jsonify({"success": False, "error": "Database not found"}), 404
+    try:
+        cur = conn.cursor()
+        cur.execute(f"SELECT vorname, name, work_path FROM {TABLE} WHERE id = ?", (entry_id,))
+        row = cur.fetchone()
+        conn.close()
+    except sqlite3.Error as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    
+    if not row or not row["work_path"] or not os.path.isfile(os.path.join(row["work_path"], filename)):
+        return jsonify({"success": False, "error": "Datei nicht gefunden"}), 404
+    
+    gallery = None
+    if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.psd')):
+        gallery = render_template("details_gallery_item.html", f=filename, entry_id=entry_id,
+                                  work_path=row["work_path"], vorname=row["vorname"], name=row["name"],
+                                  full_size=full_size, db=db)
+    return jsonify({
+        "success": True,
+        "row": render_template("details_file_row.html", file=get_file_info(row["work_path"], filename)),
+        "gallery": gallery
+    })
+
+@app.route("/rows")
+def index_rows():
+    """Tabellenzeilen der Übersicht für Live-Updates, alle angefragten Einträge (?ids=1,2,3) in einer Antwort"""
+    db = request.args.get("db") or DB_PATH
+    entry_ids = [int(raw_id) for raw_id in request.args.get("ids", "").split(",") if raw_id.strip().isdigit()]
+    if not entry_ids:
+        return "", 400
+    conn = get_db_connection(db)
+    if conn is None:
+        return "Database not found", 404
+    rows = []
+    try:
+        cur = conn.cursor()
+        for start in range(0, len(entry_ids), SQL_IN_CHUNK):
+            chunk = entry_ids[start:start + SQL_IN_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            cur.execute(f"SELECT * FROM {TABLE} WHERE id IN ({placeholders})", chunk)
+            rows.extend(cur.fetchall())
+    except sqlite3.Error as e:
+        return "Database error", 404
+    finally:
+        conn.close()
+    return "".join(render_template("index_row.html", row=row, db=db) for row in rows)
+
+def safe_filename_part(value):
+    """Ersetzt Zeichen, die in Datei- und Ordnernamen Probleme machen"""
+    return str(value).replace(" ", "_").replace("/", "-").replace("\\", "-").replace(":", "-")
+
+def collect_final_images(entries):
+    """
+    Ermittelt die vorhandenen finalen Bilder der Einträge und ihre Namen im Export.
+    
+    Returns:
+        tuple: (Liste von (quellpfad, exportname), Anzahl der Einträge ohne finales Bild)
+    """
+    final_images = []
+    skipped_count = 0
+    for entry in entries:
+        entry_id, vorname, name, bestellnummer, work_path, final_picture_1, final_picture_2, final_picture_3 = entry
+        
+        # Erstelle einen sicheren Basisnamen für die Bilder
+        base_filename = f"{safe_filename_part(vorname)}_{safe_filename_part(name)}_{safe_filename_part(bestellnummer)}"
+        
+        # Mindestens ein Feld muss Daten enthalten
+        has_valid_pic = False
+        for i, pic_path in enumerate([final_picture_1, final_picture_2, final_picture_3], 1):
+            if pic_path and os.path.exists(pic_path):
+                has_valid_pic = True
+                _, ext = os.path.splitext(pic_path)
+                final_images.append((pic_path, f"{base_filename}_row{i}{ext}"))
+        
+        if not has_valid_pic:
+            skipped_count += 1
+    return final_images, skipped_count
+
+def format_records_log(entries, location, feiertag, feierzeit):
+    """Inhalt der Log-Datei mit allen exportierten Datensätzen"""
+    lines = [
+        f"Datenbankabfrage vom {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Filter: {', '.join(filter(None, [location, feiertag, feierzeit]))}",
+        "",
+        "ID | Vorname | Name | Bestellnummer | Work Path | Final Picture 1 | Final Picture 2 | Final Picture 3",
+        "-" * 120
+    ]
+    lines.extend(" | ".join(str(item) for item in entry) for entry in entries)
+    return "\n".join(lines) + "\n"
+
 @app.route("/dbfunc", methods=["GET", "POST"])
 def dbfunc():
     """Funktionen-Seite mit Dropdown-Menüs für Feierzeit und Feiertag"""
@@ -638,8 +1218,8 @@ def dbfunc():
             if not feierzeit and not feiertag and not location:
                 message = "Bitte wählen Sie mindestens einen Filter aus (Feierzeit, Feiertag oder Location)."
                 success = False
-            elif action == "prepare_final_images":
-                # Aktion: Finale Bilder im OUT bereitstellen
+            elif action in ("prepare_final_images", "download_zip"):
+                # Aktion: Finale Bilder im OUT bereitstellen bzw. als ZIP herunterladen
                 try:
                     # Abfrage erstellen basierend auf den ausgewählten Filtern + Status = "Erledigt"
                     query = f"SELECT id, vorname, name, bestellnummer, work_path, final_picture_1, final_picture_2, final_picture_3 FROM {TABLE} WHERE status = 'Erledigt'"
@@ -678,6 +1258,19 @@ def dbfunc():
                         folder_name = "_".join(folder_components)
                         folder_name = folder_name.replace("/", "-").replace("\\", "-").replace(":", "-")
                         
+                        if action == "download_zip":
+                            # ZIP direkt in die Antwort streamen, ohne Zwischenkopie im OUT-Verzeichnis
+                            conn.close()
+                            final_images, _ = collect_final_images(entries)
+                            manifest_name = f"db_records_{folder_name}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+                            manifest = format_records_log(entries, location, feiertag, feierzeit)
+                            zip_name = urllib.parse.quote(f"{folder_name}.zip")
+                            return Response(
+                                stream_with_context(stream_zip(final_images, [(manifest_name, manifest)])),
+                                mimetype="application/zip",
+                                headers={"Content-Disposition": f"attachment; filename*=UTF-8''{zip_name}"}
+                            )
+                        
                         # Definiere den Pfad zum OUT-Verzeichnis
                         out_dir = "/diashow/out"
                         target_dir = os.path.join(out_dir, folder_name)
@@ -686,66 +1279,27 @@ def dbfunc():
                             # Erstelle das Verzeichnis, falls es nicht existiert
                             os.makedirs(target_dir, exist_ok=True)
                             
-                            # Zähler für kopierte Bilder
-                            copied_count = 0
-                            skipped_count = 0
-                            
                             # Log-Datei für alle Datensätze erstellen
                             log_filename = os.path.join(target_dir, f"db_records_{folder_name}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
                             with open(log_filename, 'w', encoding='utf-8') as log_file:
-                                log_file.write(f"Datenbankabfrage vom {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                                log_file.write(f"Filter: {', '.join(filter(None, [location, feiertag, feierzeit]))}\n\n")
-                                log_file.write("ID | Vorname | Name | Bestellnummer | Work Path | Final Picture 1 | Final Picture 2 | Final Picture 3\n")
-                                log_file.write("-" * 120 + "\n")
-                                for entry in entries:
-                                    log_file.write(" | ".join(str(item) for item in entry) + "\n")
+                                log_file.write(format_records_log(entries, location, feiertag, feierzeit))
                             
-                            # Iteriere über alle gefundenen Einträge
-                            for entry in entries:
-                                entry_id, vorname, name, bestellnummer, work_path, final_picture_1, final_picture_2, final_picture_3 = entry
-                                
-                                # Erstelle einen sicheren Basisnamen für die Bilder
-                                safe_vorname = vorname.replace(" ", "_").replace("/", "-").replace("\\", "-").replace(":", "-")
-                                safe_name = name.replace(" ", "_").replace("/", "-").replace("\\", "-").replace(":", "-")
-                                safe_bestellnummer = str(bestellnummer).replace(" ", "_").replace("/", "-").replace("\\", "-").replace(":", "-")
-                                base_filename = f"{safe_vorname}_{safe_name}_{safe_bestellnummer}"
-                                
-                                # Prüfe jedes der final_picture-Felder
-                                final_pics = [final_picture_1, final_picture_2, final_picture_3]
-                                
-                                # Mindestens ein Feld muss Daten enthalten
-                                has_valid_pic = False
-                                
-                                for i, pic_path in enumerate(final_pics, 1):
-                                    if pic_path and os.path.exists(pic_path):
-                                        has_valid_pic = True
-                                        
-                                        # Bestimme die Dateiendung
-                                        _, ext = os.path.splitext(pic_path)
-                                        
-                                        # Erstelle den neuen Dateinamen
-                                        new_filename = f"{base_filename}_row{i}{ext}"
-                                        target_path = os.path.join(target_dir, new_filename)
-                                        
-                                        # Kopiere die Datei
-                                        try:
-                                            import shutil
-                                            shutil.copy2(pic_path, target_path)
-                                            copied_count += 1
-                                            
-                                            # Log für jede kopierte Datei
-                                            copy_log_path = os.path.join(target_dir, f"copied_files_{folder_name}.log")
-                                            with open(copy_log_path, 'a', encoding='utf-8') as copy_log:
-                                                copy_log.write(f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Kopiert: {pic_path} -> {target_path}\n")
-                                        except Exception as copy_err:
-                                            print(f"Fehler beim Kopieren von {pic_path}: {str(copy_err)}")
-                                            skipped_count += 1
-                                
-                                if not has_valid_pic:
-                                    skipped_count += 1
+                            # Quelldateien und Zielnamen aller finalen Bilder bestimmen
+                            final_images, skipped_count = collect_final_images(entries)
+                            jobs = [(pic_path, os.path.join(target_dir, new_filename)) for pic_path, new_filename in final_images]
+                            
+                            # Parallel kopieren, unveränderte Dateien überspringen, ein gemeinsames Log
+                            copy_log_path = os.path.join(target_dir, f"copied_files_{folder_name}.log")
+                            link_mode = 'hard' if request.form.get("use_hardlinks") else 'copy'
+                            stats = copy_files(jobs, workers=COPY_WORKERS, link_mode=link_mode, log_path=copy_log_path)
+                            for pic_path, error in stats['errors']:
+                                print(f"Fehler beim Kopieren von {pic_path}: {error}")
+                            skipped_count += stats['failed']
                             
                             # Erstelle eine Erfolgsmeldung
-                            message = f"{len(entries)} Einträge gefunden. {copied_count} Bilder nach {target_dir} kopiert. {skipped_count} Einträge übersprungen."
+                            message = (f"{len(entries)} Einträge gefunden. {stats['copied']} Bilder nach {target_dir} kopiert, "
+                                       f"{stats['linked']} verlinkt, {stats['skipped']} unverändert. "
+                                       f"{skipped_count} Einträge übersprungen. ({stats['seconds']:.1f} s)")
                             success = True
                         except Exception as e:
                             message = f"Fehler bei der Verarbeitung: {str(e)}"
@@ -772,5 +1326,46 @@ def dbfunc():
             conn.close()
         return f"Datenbankfehler: {str(e)}", 500
 
+@app.route("/unassigned")
+def unassigned():
+    """Quellbilder, die checkpic keinem Eintrag zuordnen konnte, mit vorgeschlagenen Einträgen (checkpic --report)"""
+    db = request.args.get("db") or DB_PATH
+    
+    conn = get_db_connection(db)
+    if conn is None:
+        return "Database not found", 404
+    
+    try:
+        rows = conn.execute(
+            f"SELECT u.source_path, u.feiertag, u.location, u.candidate_rank, u.entry_id, u.score, u.created_at, "
+            f"a.vorname, a.name, a.bestellnummer "
+            f"FROM checkpic_unassigned u LEFT JOIN {TABLE} a ON a.id = u.entry_id "
+            f"ORDER BY u.feiertag, u.location, u.source_path, u.candidate_rank"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        rows = None  # Bericht wurde noch nie erstellt
+    finally:
+        conn.close()
+    
+    # Eine Zeile pro Bild, Vorschläge darunter
+    files = collections.OrderedDict()
+    for row in rows or []:
+        item = files.setdefault(row["source_path"], {
+            "path": row["source_path"],
+            "name": os.path.basename(row["source_path"]),
+            "feiertag": row["feiertag"],
+            "location": row["location"],
+            "candidates": [],
+        })
+        if row["entry_id"] is not None:
+            item["candidates"].append(row)
+    
+    return render_template("unassigned.html",
+                           db=db,
+                           files=list(files.values()),
+                           report_missing=rows is None,
+                           created_at=rows[0]["created_at"] if rows else None)
+
 if __name__ == "__main__":
+    prepare_name_keys(DB_PATH)
     app.run(debug=True, host="0.0.0.0", port=4444)
@@ -1,7 +1,9 @@
 import argparse
 import sys
 import os
-from PIL import Image, ImageDraw, ImageFont, ExifTags
+import math
+import functools
+from PIL import Image, ImageDraw, ImageFont
 
 
 # Create a semi-transparent gray background for text
@@ -20,43 +22,91 @@ horizontal_text_pos = 50
 vertical_text_pos = 20
 text_y_offset = 5
 
+# Maximale Breite des Namens, bevor eine kleinere Schrift gewählt wird
+vertical_text_max_width = 800
+horizontal_text_max_width = 1900
+max_chars_per_line = 10  # Zeilenumbruch für Hochformat
 
-def get_image_orientation(image_path):
+# Schnelles Dekodieren: JPEGs per DCT-Skalierung (Image.draft) nahe an der Zielgröße laden,
+# dann per reduce() (reducing_gap) verkleinern und erst zum Schluss mit LANCZOS auf Endgröße bringen
+FAST_DECODE = True
+DRAFT_REDUCING_GAP = 1.5   # draft lädt mindestens das 1,5-fache der Zielgröße
+RESIZE_REDUCING_GAP = 3.0  # reduce() nur, wenn danach noch mindestens Faktor 3 für LANCZOS bleibt
+
+# EXIF-Orientierung -> verlustfreie Transposition (alle acht Werte, inkl. gespiegelter 2/4/5/7)
+EXIF_ORIENTATION_TAG = 0x0112
+ORIENTATION_TRANSPOSE = {
+    1: None,
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+ORIENTATION_SWAPS_AXES = (5, 6, 7, 8)
+
+# Größe der prozessweiten Caches für Schriften und Textlayouts
+FONT_CACHE_SIZE = 16
+LAYOUT_CACHE_SIZE = 1024
+# Vorgerenderte Namensüberblendungen (Name x Ausrichtung x Seite x Profil). Ein Sprite umfasst nur Balken bzw.
+# Text samt Schatten (quer: Leinwandbreite x Balkenhöhe, bis ~4 MB bei 4K); ein Teilnehmer braucht höchstens 3
+# (quer, hoch links, hoch rechts)
+OVERLAY_CACHE_SIZE = 4
+
+# Version der Bildgestaltung; erhöhen, wenn sich die Ausgabe ändert, damit autoallpics --refresh neu rendert
+RENDER_VERSION = 1
+
+# Render-Profile: Zielgröße der Leinwand. Alle Maße oben beziehen sich auf 1080p
+# und werden mit Höhe/1080 skaliert, damit Aufteilung und Schrift in jedem Profil gleich aussehen.
+REFERENCE_HEIGHT = 1080
+RENDER_PROFILES = {
+    '4k': (3840, 2160),      # Master
+    '1080p': (1920, 1080),   # Standard für Diashow/Videoschnitt
+    '720p': (1280, 720),     # Vorschau im Web-Viewer
+}
+DEFAULT_PROFILE = '1080p'
+
+# Encoder-Profile für das Speichern: Format, Dateiendung und Pillow-Parameter.
+# 'default' leitet das Format aus der Endung ab und nutzt Pillows Standardwerte (JPEG Qualität 75).
+ENCODER_PROFILES = {
+    'default': {'format': None, 'ext': None, 'params': {}},
+    'jpeg-fast': {'format': 'JPEG', 'ext': '.jpg', 'params': {'quality': 85, 'subsampling': 2}},
+    'jpeg-web': {'format': 'JPEG', 'ext': '.jpg', 'params': {'quality': 85, 'subsampling': 2, 'optimize': True, 'progressive': True}},
+    'jpeg-high': {'format': 'JPEG', 'ext': '.jpg', 'params': {'quality': 95, 'subsampling': 0, 'optimize': True}},
+    'webp': {'format': 'WEBP', 'ext': '.webp', 'params': {'quality': 85, 'method': 4}},
+    'png': {'format': 'PNG', 'ext': '.png', 'params': {'compress_level': 6}},
+}
+DEFAULT_ENCODER = 'default'
+
+
+def get_exif_orientation(img):
     """
-    Get the orientation of the image based on EXIF data.
+    Get the EXIF orientation of an opened image.
     
     Args:
-        image_path (str): Path to the input image.
+        img (PIL.Image): Opened (not necessarily loaded) image
     
     Returns:
-        int: Rotation angle in degrees (0, 90, 180, 270).
+        int: EXIF orientation 1-8 (1 if missing or invalid)
     """
     try:
-        img = Image.open(image_path)
-        # Get EXIF data
-        exif = img._getexif()
-        
-        if exif is not None:
-            for tag, value in exif.items():
-                if tag in ExifTags.TAGS and ExifTags.TAGS[tag] == 'Orientation':
-                    if value == 1:
-                        return 0
-                    elif value == 3:
-                        return 180
-                    elif value == 6:
-                        return 270
-                    elif value == 8:
-                        return 90
-        
-        # Default rotation if no EXIF data or orientation is not found
-        return 0
-    
+        orientation = img.getexif().get(EXIF_ORIENTATION_TAG, 1)
     except Exception as e:
         print(f"Error reading EXIF data: {e}")
-        return 0  # Default rotation
+        return 1
+    return orientation if orientation in ORIENTATION_TRANSPOSE else 1
 
 
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
 def load_font(font_size):
+    """
+    Load the caption font in the given size.
+    
+    The result is cached per process, so the chain of truetype fallbacks
+    (which searches the system font paths) only runs once per size.
+    """
     # Try to load a nice font with a MUCH larger size
     try:
         # Try several common fonts
@@ -78,6 +128,29 @@ def load_font(font_size):
         # Absolute fallback - use default
         return ImageFont.load_default()
 
+def get_render_params(fast_decode=None, profile=None, encoder=None):
+    """Renderer parameters that affect the output image (recorded in the render manifest)."""
+    profile = profile or DEFAULT_PROFILE
+    encoder = encoder or DEFAULT_ENCODER
+    return {
+        'encoder': [encoder, ENCODER_PROFILES[encoder]['params']],
+        'version': RENDER_VERSION,
+        'canvas': list(RENDER_PROFILES[profile]),
+        'font_sizes': [default_font_size, smal_font_size, ultra_smal_font_size],
+        'line_spacing': default_font_line_spacing,
+        'text_max_width': [vertical_text_max_width, horizontal_text_max_width],
+        'max_chars_per_line': max_chars_per_line,
+        'fast_decode': FAST_DECODE if fast_decode is None else fast_decode,
+        'draft_reducing_gap': DRAFT_REDUCING_GAP,
+        'resize_reducing_gap': RESIZE_REDUCING_GAP,
+    }
+
+def warm_font_cache(profile=None):
+    """Load all caption font sizes of a profile into the font cache (e.g. once per worker process)."""
+    scale = RENDER_PROFILES[profile or DEFAULT_PROFILE][1] / REFERENCE_HEIGHT
+    for font_size in (default_font_size, smal_font_size, ultra_smal_font_size):
+        load_font(round(font_size * scale))
+
 def calcTextSize(aFont, aText, line_spacing = 40):
     # Recalculate text dimensions with wrapped text
     """Calculate the bounding box for a multiline text."""
@@ -106,10 +179,165 @@ def calcTextSize(aFont, aText, line_spacing = 40):
 
         return atext_width, atext_height
 
-def process_image(image_path, person_name, shift_right=True):
+def wrap_name(person_name):
+    """Wrap the name by inserting newlines at spaces (and after hyphens) for the side text of vertical images."""
+    wrapped_name = ""
+    
+    words = person_name.replace('-','- ').split()
+    current_line = words[0]
+    
+    for word in words[1:]:
+        if len(current_line) + len(word) + 1 <= max_chars_per_line:
+            current_line += " " + word
+        else:
+            wrapped_name += current_line + "\n"
+            current_line = word
+    
+    wrapped_name += current_line
+    return wrapped_name
+
+
+@functools.lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def get_text_layout(person_name, is_vertical, scale=1.0):
+    """
+    Choose font size and line breaks for a name.
+    
+    The layout only depends on the name, the orientation and the profile scale,
+    so it is cached and computed once for all pictures of a participant.
+    The font size is always chosen at the 1080p reference size and then scaled,
+    so a name gets the same relative size in every profile.
+    
+    Args:
+        person_name (str): Name to overlay on the image
+        is_vertical (bool): True for the side text of vertical images, False for the bottom bar
+        scale (float): Canvas height / 1080
+    
+    Returns:
+        tuple: (font_size, text, text_width, text_height)
+    """
+    if scale != 1.0:
+        font_size, text, _, _ = get_text_layout(person_name, is_vertical)
+        font_size = round(font_size * scale)
+        text_width, text_height = calcTextSize(load_font(font_size), text, round(default_font_line_spacing * scale))
+        return font_size, text, text_width, text_height
+    
+    if is_vertical:
+        text = wrap_name(person_name)
+        max_width = vertical_text_max_width
+    else:
+        text = person_name
+        max_width = horizontal_text_max_width
+    
+    # Use the largest font size for which the text still fits
+    for font_size in (default_font_size, smal_font_size, ultra_smal_font_size):
+        text_width, text_height = calcTextSize(load_font(font_size), text, default_font_line_spacing)
+        if text_width <= max_width:
+            break
+    
+    return font_size, text, text_width, text_height
+
+
+@functools.lru_cache(maxsize=OVERLAY_CACHE_SIZE)
+def get_name_overlay(person_name, is_vertical, shift_right, profile):
+    """
+    Render the name overlay (gray bar, shadow and text) once as an RGBA sprite.
+    
+    The overlay only depends on the name, the orientation, the side and the
+    profile, so the text is rasterized once per participant and afterwards
+    only alpha-composited onto each canvas. The sprite is only as large as
+    the bar or the text with its shadow, never the full canvas.
+    
+    Returns:
+        tuple: (PIL.Image RGBA sprite covering bar, shadow and text, (x, y) position on the canvas)
+    """
+    canvas_width, canvas_height = RENDER_PROFILES[profile]
+    scale = canvas_height / REFERENCE_HEIGHT
+    
+    def px(value):
+        """Scale a 1080p layout measure to the profile."""
+        return round(value * scale)
+    
+    font_size, text, text_width, text_height = get_text_layout(person_name, is_vertical, scale)
+    font = load_font(font_size)
+    text_align = "center"
+    bar_box = None
+    
+    if is_vertical:
+        # For vertical images, place text on the side (opposite to the image shift) without a gray bar
+        if shift_right:
+            # Image is on the right with margin, so text goes on the left side
+            text_x = px(200)  # Left margin
+        else:
+            # Image is on the left with margin, so text goes on the right side
+            text_x = canvas_width - text_width - px(200)  # Right margin
+        
+        # Center text vertically
+        text_y = (canvas_height - text_height) // 2
+    else: # QUER
+        # For horizontal images, place text centered at the bottom
+        text_x = canvas_width // 2 - text_width // 2
+        
+        # Calculate background dimensions for bottom placement
+        text_bg_height = int(text_height + px(padding_vertical)*2) # - font_size * 0.2)
+        
+        # Position the background at the bottom
+        bg_y_position = canvas_height - text_bg_height - px(horizontal_text_pos)
+        text_y = bg_y_position + px(padding_vertical) - px(30)  # Move text up a bit
+        
+        # Full-width background
+        bar_box = (0, bg_y_position, canvas_width, bg_y_position + text_bg_height)
+    
+    # Rasterize the text once; shadow and text are both filled through this mask
+    text_position = (text_x, text_y + px(text_y_offset))
+    text_left, text_top, text_right, text_bottom = ImageDraw.Draw(Image.new('L', (1, 1))).multiline_textbbox(
+        text_position, text, font=font, align=text_align)
+    text_left, text_top = math.floor(text_left), math.floor(text_top)
+    text_right, text_bottom = math.ceil(text_right), math.ceil(text_bottom)
+    text_mask = Image.new('L', (text_right - text_left, text_bottom - text_top), 0)
+    ImageDraw.Draw(text_mask).text((text_position[0] - text_left, text_position[1] - text_top), text,
+                                   fill=255, font=font, align=text_align)
+    
+    # The sprite only covers the bar and the text with its shadow, clipped to the canvas
+    shadow_offset = px(4)
+    left, top = text_left, text_top
+    right, bottom = text_right + shadow_offset, text_bottom + shadow_offset
+    if bar_box:
+        left, top = min(left, bar_box[0]), min(top, bar_box[1])
+        right, bottom = max(right, bar_box[2]), max(bottom, bar_box[3])
+    left, top = max(left, 0), max(top, 0)
+    right, bottom = min(right, canvas_width), min(bottom, canvas_height)
+    
+    # Premultiplied colors in an RGB image plus the coverage in an L image: paste() blends these
+    # channels linearly with the mask, which is exactly alpha compositing ("over") of bar, shadow and text
+    size = (right - left, bottom - top)
+    color_layer = Image.new('RGB', size, (0, 0, 0))
+    alpha_layer = Image.new('L', size, 0)
+    if bar_box:
+        bar_alpha = darker_gray[3]
+        bar_box = (bar_box[0] - left, bar_box[1] - top, bar_box[2] - left, bar_box[3] - top)
+        color_layer.paste(tuple(round(value * bar_alpha / 255) for value in darker_gray[:3]), bar_box)
+        alpha_layer.paste(bar_alpha, bar_box)
+    
+    # Shadow (opaque black, as drawn on the RGB canvas before) and text in sun yellow, over the bar
+    sun_yellow = (255, 215, 0)  # RGB value for sun yellow
+    for offset, color in ((shadow_offset, shadow_color[:3]), (0, sun_yellow)):
+        mask_x, mask_y = text_left - left + offset, text_top - top + offset
+        mask_box = (mask_x, mask_y, mask_x + text_mask.width, mask_y + text_mask.height)
+        color_layer.paste(color, mask_box, text_mask)
+        alpha_layer.paste(255, mask_box, text_mask)
+    
+    # Back to straight alpha for paste()
+    premultiplied = Image.merge('RGBa', (*color_layer.split(), alpha_layer))
+    sprite = premultiplied.convert('RGBA')
+    for image in (text_mask, color_layer, alpha_layer, premultiplied):
+        image.close()
+    return sprite, (left, top)
+
+
+def process_image(image_path, person_name, shift_right=True, fast_decode=None, profile=None, profiler=None):
     """
     Process an image by:
-    1. Resizing to Full HD (1920x1080)
+    1. Resizing to the profile canvas (Full HD 1920x1080 by default)
     2. If vertical, shift 25% to left/right and add name on the other side
     3. If horizontal, add name at the bottom
     4. Add semi-transparent gray background behind the name
@@ -118,168 +346,102 @@ def process_image(image_path, person_name, shift_right=True):
         image_path (str): Path to the input image
         person_name (str): Name to overlay on the image
         shift_right (bool): If True, shift vertical images to the right, else to the left
+        fast_decode (bool, optional): Decode at reduced resolution before resizing (default: FAST_DECODE)
+        profile (str, optional): Key of RENDER_PROFILES (default: DEFAULT_PROFILE)
+        profiler (optional): Object with mark(stage), called after each stage
+            (decode, resize, orientation, layout, compose, text), e.g. dbv_memprofile.StageProfiler
     
     Returns:
-        PIL.Image: Processed image
+        PIL.Image: Processed image (the caller closes it)
     """
+    if fast_decode is None:
+        fast_decode = FAST_DECODE
+    canvas_width, canvas_height = RENDER_PROFILES[profile or DEFAULT_PROFILE]
+    scale = canvas_height / REFERENCE_HEIGHT
+    
+    def px(value):
+        """Scale a 1080p layout measure to the profile."""
+        return round(value * scale)
+    
     try:
-        # Open the image
-        img = Image.open(image_path)
+        # Open the image once; EXIF is read from the header, pixels are decoded on resize.
+        # The decoded original is released as soon as the resized copy exists.
+        with Image.open(image_path) as img:
+            orientation = get_exif_orientation(img)
+            swap_axes = orientation in ORIENTATION_SWAPS_AXES
         
-        # Get original dimensions
-        width, height = img.size
-
-        # Get the rotation angle based on EXIF data
-        rotation_angle = get_image_orientation(image_path)
+            if fast_decode:
+                # Only decode as many pixels as the output needs (JPEG DCT scaling, no-op for other formats)
+                src_width, src_height = img.size
+                target_height = src_width if swap_axes else src_height
+                draft_scale = canvas_height / target_height
+                if draft_scale * DRAFT_REDUCING_GAP < 1:
+                    img.draft(img.mode, (int(src_width * draft_scale * DRAFT_REDUCING_GAP),
+                                         int(src_height * draft_scale * DRAFT_REDUCING_GAP)))
         
-        # Rotate the image if necessary
-        if rotation_angle != 0:
-            img = img.rotate(rotation_angle, expand=True)
-            width, height = img.size  # Update dimensions after rotation    
+            # Dimensions as displayed, i.e. after applying the EXIF orientation
+            width, height = img.size
+            if swap_axes:
+                width, height = height, width
         
-        # Determine if the image is vertical or horizontal
-        is_vertical = (height / width)  > 1.05
+            # Determine if the image is vertical or horizontal
+            is_vertical = (height / width)  > 1.05
          
-        # Create a black canvas with Full HD resolution (1920x1080)
-        canvas = Image.new('RGB', (1920, 1080), (0, 0, 0))
+            # Resize the image while maintaining aspect ratio
+            ratio = canvas_height / height
+            new_width = int(width * ratio)
+            new_height = canvas_height
         
-        # Resize the image while maintaining aspect ratio
-        ratio = 1080 / height
-        new_width = int(width * ratio)
-        new_height = 1080
-        resized_img = img.resize((new_width, new_height), Image.LANCZOS)
+            # Decode (at the draft size), then resize in stored orientation and
+            # apply the orientation losslessly on the small image
+            img.load()
+            if profiler:
+                profiler.mark('decode')
+            resize_size = (new_height, new_width) if swap_axes else (new_width, new_height)
+            resized_img = img.resize(resize_size, Image.LANCZOS,
+                                     reducing_gap=RESIZE_REDUCING_GAP if fast_decode else None)
+        if profiler:
+            profiler.mark('resize')
         
-        # Text Vorbereiten
-        # Add text with semi-transparent background
-        draw = ImageDraw.Draw(canvas)
+        if ORIENTATION_TRANSPOSE[orientation] is not None:
+            transposed_img = resized_img.transpose(ORIENTATION_TRANSPOSE[orientation])
+            resized_img.close()
+            resized_img = transposed_img
+        if profiler:
+            profiler.mark('orientation')
         
-            
-        
-        if is_vertical:
-            # Wrap the name by inserting newlines at spaces
-            wrapped_name = ""
-            max_chars_per_line = 10  # Adjust based on font size
-            
-            words = person_name.replace('-','- ').split()
-            current_line = words[0]
-            
-            for word in words[1:]:
-                if len(current_line) + len(word) + 1 <= max_chars_per_line:
-                    current_line += " " + word
-                else:
-                    wrapped_name += current_line + "\n"
-                    current_line = word
-            
-            wrapped_name += current_line
-            
-            # Use the wrapped name instead of the original
-            person_name = wrapped_name
-            
-            # Calculate Font
-            font = load_font(default_font_size)
-            font_size = font.size
-            text_width, text_height = calcTextSize(font, person_name, default_font_line_spacing)
-            
-            if text_width > 800:
-                font = load_font(smal_font_size)
-                font_size = font.size
-            text_width, text_height = calcTextSize(font, person_name, default_font_line_spacing)
-            
-            if text_width > 800:
-                font = load_font(ultra_smal_font_size)
-                font_size = font.size
-            text_width, text_height = calcTextSize(font, wrapped_name, default_font_line_spacing)
-        else:
-            # Calculate Font
-            font = load_font(default_font_size)
-            font_size = font.size
-            text_width, text_height = calcTextSize(font, person_name, default_font_line_spacing)
-            
-            if text_width > 1900:
-                font = load_font(smal_font_size)
-                font_size = font.size
-            text_width, text_height = calcTextSize(font, person_name, default_font_line_spacing)
-            
-            if text_width > 1900:
-                font = load_font(ultra_smal_font_size)
-                font_size = font.size  
-            
-            # Calculate text size (compatible with newer Pillow versions)
-            text_width, text_height = calcTextSize(font, person_name, default_font_line_spacing)
+        # Textbreite bestimmt die Verschiebung bei Hochformat (Layout wird pro Name, Ausrichtung und Profil nur einmal berechnet)
+        _, _, text_width, _ = get_text_layout(person_name, is_vertical, scale)
+        if profiler:
+            profiler.mark('layout')
         
         # Bild vorbereiten
         if is_vertical: 
             # Calculate the position to paste the image (35% shift - increased from 25%)
-            shift_amount = int((1920 - new_width - text_width) * 0.25)  # More room for text
+            shift_amount = int((canvas_width - new_width - text_width) * 0.25)  # More room for text
             
             if shift_right:
                 # Shift image to the right with margin, text will be on the left
-                paste_position = (1920 - new_width - vertical_text_pos - shift_amount, 0)  # 80px margin from right edge
-                text_position = (1920 // 2, 1080 - vertical_text_pos)  # Position closer to bottom
-                text_align = "center"
+                paste_position = (canvas_width - new_width - px(vertical_text_pos) - shift_amount, 0)  # 80px margin from right edge
             else:
                 # Shift image to the left with margin, text will be on the right
-                paste_position = (vertical_text_pos + shift_amount, 0)  # 80px margin from left edge
-                text_position = (1920 // 2, 1080 - vertical_text_pos)  # Position closer to bottom
-                text_align = "center"
+                paste_position = (px(vertical_text_pos) + shift_amount, 0)  # 80px margin from left edge
         else:
             # Center the image vertically
-            paste_position = ((1920 - new_width) // 2, 0)
-            text_position = (1920 // 2, 1080 - horizontal_text_pos)  # Position closer to bottom
-            text_align = "center"
+            paste_position = ((canvas_width - new_width) // 2, 0)
         
-        # Paste the resized image onto the canvas
+        # Create a black canvas with the profile resolution and paste the resized image onto it
+        canvas = Image.new('RGB', (canvas_width, canvas_height), (0, 0, 0))
         canvas.paste(resized_img, paste_position)
+        resized_img.close()
+        if profiler:
+            profiler.mark('compose')
         
-
-       
-        if is_vertical:
-            # For vertical images, place text on the side (opposite to the image shift) without a gray bar
-               
-            if shift_right:
-                # Image is on the right with margin, so text goes on the left side
-                text_x = 200  # Left margin
-            else:
-                # Image is on the left with margin, so text goes on the right side
-                text_x = 1920 - text_width - 200  # Right margin
-            
-            # Center text vertically
-            text_y = (1080 - text_height) // 2
-            
-            # Create a semi-transparent background for the text
-            text_bg_height = int(text_height + padding_vertical*2 - font_size * 0.2) # Height of the background
-            text_bg_width = int(text_width + padding_horizontal * 2)    # Width of the background
-            text_bg = Image.new('RGBA', (text_bg_width, text_bg_height), (80, 80, 80, 168))  # Darker gray with opacity
-            #canvas.paste(text_bg, (text_x - padding_horizontal, text_y + padding_vertical), text_bg)
-            
-        else: # QUER
-            # For horizontal images, place text at the bottom
-                    # Adjust text position based on alignment
-            if text_align == "center":
-                text_x = text_position[0] - text_width // 2
-            elif text_align == "right":
-                text_x = text_position[0] - text_width
-            else:  # left
-                text_x = text_position[0]
-
-            # Calculate background dimensions for bottom placement
-            text_bg_height = int(text_height + padding_vertical*2) # - font_size * 0.2)
-            
-            # Position the background at the bottom
-            bg_y_position = 1080 - text_bg_height - horizontal_text_pos
-            text_y = bg_y_position + padding_vertical - 30  # Move text up a bit
-            
-            # Create and paste the full-width background
-            text_bg = Image.new('RGBA', (1920, text_bg_height), darker_gray)
-            canvas.paste(text_bg, (0, bg_y_position), text_bg)
-        
-        # Draw the text in sun yellow color
-        sun_yellow = (255, 215, 0)  # RGB value for sun yellow
-        
-        # Use align parameter for multiline text
-        draw.text((text_x+4, text_y+text_y_offset+4), person_name, fill=shadow_color , font=font, align=text_align)
-        draw.text((text_x, text_y+text_y_offset), person_name, fill=sun_yellow, font=font, align=text_align)
-        
+        # Name (Balken, Schatten, Text) als fertiges RGBA-Sprite einblenden
+        overlay, overlay_position = get_name_overlay(person_name, is_vertical, shift_right, profile or DEFAULT_PROFILE)
+        canvas.paste(overlay, overlay_position, overlay)
+        if profiler:
+            profiler.mark('text')
         
         return canvas
     
@@ -287,17 +449,41 @@ def process_image(image_path, person_name, shift_right=True):
         print(f"Error processing image: {e}")
         raise  
     
-def execute_autoconvert(source, dest, text):
+def get_encoder_dest_path(dest, encoder=None):
+    """Replace the file extension of dest with the one of the encoder profile (if it has a fixed format)."""
+    ext = ENCODER_PROFILES[encoder or DEFAULT_ENCODER]['ext']
+    if ext is None:
+        return dest
+    return os.path.splitext(dest)[0] + ext
+
+
+def save_image(image, dest, encoder=None):
+    """Save an image with the settings of an encoder profile."""
+    settings = ENCODER_PROFILES[encoder or DEFAULT_ENCODER]
+    image.save(dest, settings['format'], **settings['params'])
+    # Overwriting a file keeps the directory mtime; touch it so the web viewer's details ETag changes
+    try:
+        os.utime(os.path.dirname(dest) or '.')
+    except OSError:
+        pass
+
+
+def execute_autoconvert(source, dest, text, fast_decode=None, profile=None, encoder=None, profiler=None):
     # Überprüfen, ob die Quelldatei existiert
     if not os.path.isfile(source):
         return False, f"Error: The source file '{source}' does not exist."
     
     try:
         # Verarbeite das Bild
-        processed_image = process_image(source, text)
+        processed_image = process_image(source, text, fast_decode=fast_decode, profile=profile, profiler=profiler)
         
-        # Speichere das bearbeitete Bild im Zielpfad
-        processed_image.save(dest)
+        # Speichere das bearbeitete Bild im Zielpfad und gib den Speicher sofort frei
+        try:
+            save_image(processed_image, dest, encoder)
+        finally:
+            processed_image.close()
+        if profiler:
+            profiler.mark('encode')
         return True, "Conversion successful"
     
     except Exception as e:
@@ -319,6 +505,11 @@ def parse_arguments():
     import_parser.add_argument('--source-file', '-s', required=True, help='Path to the source image')
     import_parser.add_argument('--destination-file', '-d', required=True, help='Path to the output image')
     import_parser.add_argument('--text', '-t', required=True, help='Caption for the image')
+    import_parser.add_argument('--full-decode', action='store_true', help='Decode the source at full resolution (slower, for comparisons)')
+    import_parser.add_argument('--profile', '-p', choices=sorted(RENDER_PROFILES), default=DEFAULT_PROFILE,
+                               help=f'Render profile / output size (default: {DEFAULT_PROFILE})')
+    import_parser.add_argument('--encoder', '-e', choices=sorted(ENCODER_PROFILES), default=DEFAULT_ENCODER,
+                               help='Encoder profile; profiles with a fixed format replace the extension of the destination file')
     
     return parser.parse_args()
 
@@ -339,5 +530,8 @@ if __name__ == "__main__":
         destination_file = args.destination_file
         text = args.text
         
-        success, message = execute_autoconvert(source_file, destination_file, text)
+        destination_file = get_encoder_dest_path(destination_file, args.encoder)
+        success, message = execute_autoconvert(source_file, destination_file, text,
+                                               fast_decode=False if args.full_decode else None,
+                                               profile=args.profile, encoder=args.encoder)
         print(message)
@@ -0,0 +1,289 @@
+"""
+Kopier-Engine für große Bildmengen.
+
+Kopiert oder verschiebt Dateien parallel über einen Thread-Pool mit begrenzter
+Anzahl gleichzeitig offener Aufträge, überspringt unveränderte Ziele
+(Größe/Änderungszeit oder Prüfsumme), legt auf Wunsch Hardlinks oder Reflinks
+(Copy-on-Write-Klone, z.B. Btrfs, XFS, APFS) an, prüft Kopien optional per
+Prüfsumme und schreibt alle Vorgänge über einen einzigen gepufferten Log-Writer.
+"""
+
+import os
+import sys
+import errno
+import shutil
+import hashlib
+import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_WORKERS = 8
+HASH_BLOCK_SIZE = 1024 * 1024
+# Offene Aufträge pro Thread; begrenzt den Speicher bei sehr vielen Dateien
+PENDING_PER_WORKER = 4
+
+# Linux: ioctl FICLONE legt einen Reflink an
+FICLONE = 0x40049409
+
+LINK_MODES = ('copy', 'hard', 'reflink')
+
+# Ergebnis eines einzelnen Vorgangs
+RESULT_COPIED = 'kopiert'
+RESULT_LINKED = 'verlinkt'
+RESULT_REFLINKED = 'reflink'
+RESULT_MOVED = 'verschoben'
+RESULT_SKIPPED = 'unverändert'
+RESULT_FAILED = 'fehler'
+
+# Zählername in copy_files und Text im Log je Ergebnis
+RESULT_STATS = {
+    RESULT_COPIED: ('copied', 'Kopiert'),
+    RESULT_LINKED: ('linked', 'Verlinkt'),
+    RESULT_REFLINKED: ('reflinked', 'Reflink'),
+    RESULT_MOVED: ('moved', 'Verschoben'),
+    RESULT_SKIPPED: ('skipped', 'Unverändert'),
+}
+
+
+def file_hash(path):
+    """SHA-256 einer Datei, blockweise gelesen."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_identical(src, dst, compare='mtime'):
+    """
+    Prüft, ob das Ziel bereits dem Original entspricht.
+
+    Args:
+        src (str): Quelldatei
+        dst (str): Zieldatei
+        compare (str): 'mtime' vergleicht Größe und Änderungszeit, 'hash' zusätzlich den Inhalt
+
+    Returns:
+        bool: True, wenn das Ziel nicht neu geschrieben werden muss
+    """
+    try:
+        src_stat = os.stat(src)
+        dst_stat = os.stat(dst)
+    except OSError:
+        return False
+
+    # Hardlink auf dieselbe Datei
+    if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if compare == 'hash':
+        return file_hash(src) == file_hash(dst)
+    # copy2 übernimmt die Änderungszeit; Toleranz für Dateisysteme mit grober Zeitauflösung (FAT/SMB)
+    return abs(src_stat.st_mtime - dst_stat.st_mtime) < 2
+
+
+def same_filesystem(src, dst):
+    """True, wenn Quelle und Zielverzeichnis auf demselben Gerät liegen (Voraussetzung für Hardlinks)."""
+    try:
+        return os.stat(src).st_dev == os.stat(os.path.dirname(os.path.abspath(dst))).st_dev
+    except OSError:
+        return False
+
+
+def reflink_file(src, dst):
+    """
+    Legt dst als Copy-on-Write-Klon von src an (teilt die Datenblöcke, bis eine Seite geändert wird).
+
+    Raises:
+        OSError: wenn Betriebs- oder Dateisystem keine Reflinks unterstützen
+    """
+    if sys.platform == 'darwin':
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), dst)
+    elif fcntl is not None:
+        with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+            try:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            except OSError:
+                dst_file.close()
+                os.remove(dst)
+                raise
+    else:
+        raise OSError(errno.EOPNOTSUPP, 'Reflinks werden nicht unterstützt', dst)
+    shutil.copystat(src, dst)
+
+
+def verify_copy(src, dst):
+    """Vergleicht die Prüfsummen von Quelle und Kopie; wirft OSError bei Abweichung."""
+    if file_hash(src) != file_hash(dst):
+        raise OSError(errno.EIO, 'Prüfsumme der Kopie stimmt nicht mit dem Original überein', dst)
+
+
+def transfer_file(src, dst, link_mode='copy', compare='mtime', verify=False, move=False):
+    """
+    Überträgt eine einzelne Datei.
+
+    Args:
+        src (str): Quelldatei
+        dst (str): Zieldatei
+        link_mode (str): 'copy', 'hard' (Hardlink, falls möglich, sonst Kopie)
+                         oder 'reflink' (Copy-on-Write-Klon, falls möglich, sonst Kopie)
+        compare (str): Vergleichsmodus für unveränderte Ziele ('mtime' oder 'hash')
+        verify (bool): Kopien nach dem Schreiben per Prüfsumme mit dem Original vergleichen
+        move (bool): Quelle danach entfernen (im selben Dateisystem einfach umbenennen);
+                     fehlt die Quelle und existiert das Ziel, gilt die Datei als bereits verschoben
+
+    Returns:
+        tuple: (Ergebnis, übertragene Bytes)
+    """
+    # Wiederholtes Verschieben (z.B. nach einem Abbruch): Quelle weg, Ziel da -> bereits erledigt
+    if move and not os.path.lexists(src) and os.path.exists(dst):
+        return RESULT_SKIPPED, 0
+
+    # Beim Verschieben wird die Quelle gelöscht, daher nur bei gleichem Inhalt als unverändert werten
+    if is_identical(src, dst, 'hash' if move else compare):
+        # Ziel ist bereits vollständig (z.B. abgebrochener Lauf), beim Verschieben fehlt nur das Entfernen
+        if move and os.path.realpath(src) != os.path.realpath(dst):
+            os.remove(src)
+        return RESULT_SKIPPED, 0
+
+    if move and same_filesystem(src, dst):
+        os.replace(src, dst)
+        return RESULT_MOVED, 0
+
+    # Erst in eine temporäre Datei schreiben, damit abgebrochene Vorgänge nie als fertig gelten
+    tmp_path = dst + '.part'
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+
+    if not move and link_mode == 'hard' and same_filesystem(src, dst):
+        try:
+            os.link(src, tmp_path)
+            os.replace(tmp_path, dst)
+            return RESULT_LINKED, 0
+        except OSError:
+            pass  # z.B. Dateisystem ohne Hardlinks -> normal kopieren
+
+    if not move and link_mode == 'reflink':
+        try:
+            reflink_file(src, tmp_path)
+            os.replace(tmp_path, dst)
+            return RESULT_REFLINKED, 0
+        except OSError:
+            pass  # z.B. ext4 oder verschiedene Dateisysteme -> normal kopieren
+
+    shutil.copy2(src, tmp_path)
+    if verify:
+        try:
+            verify_copy(src, tmp_path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+    os.replace(tmp_path, dst)
+    size = os.path.getsize(dst)
+    if move:
+        os.remove(src)
+        return RESULT_MOVED, size
+    return RESULT_COPIED, size
+
+
+def copy_files(jobs, workers=DEFAULT_WORKERS, link_mode='copy', compare='mtime', log_path=None,
+               verify=False, move=False, on_result=None):
+    """
+    Überträgt viele Dateien parallel.
+
+    Args:
+        jobs (iterable): (quelle, ziel)-Tupel
+        workers (int): Anzahl paralleler Threads
+        link_mode (str): 'copy', 'hard' oder 'reflink'
+        compare (str): 'mtime' oder 'hash' für die Erkennung unveränderter Ziele
+        log_path (str, optional): Log-Datei (Anhängen), wird einmal geöffnet und gepuffert geschrieben
+        verify (bool): Kopien per Prüfsumme prüfen
+        move (bool): Quellen nach erfolgreicher Übertragung entfernen
+        on_result (callable, optional): Wird im aufrufenden Thread je Datei mit
+            (quelle, ziel, Ergebnis, Fehlertext oder None) aufgerufen
+
+    Returns:
+        dict: Zähler (copied, linked, reflinked, moved, skipped, failed, bytes, seconds)
+              und errors (Liste von (quelle, meldung))
+    """
+    stats = {'copied': 0, 'linked': 0, 'reflinked': 0, 'moved': 0, 'skipped': 0, 'failed': 0,
+             'bytes': 0, 'seconds': 0.0, 'errors': []}
+    jobs = iter(jobs)
+    workers = max(1, workers)
+
+    start = datetime.datetime.now()
+    log_file = open(log_path, 'a', encoding='utf-8', buffering=64 * 1024) if log_path else None
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+
+            def submit_next():
+                for src, dst in jobs:
+                    future = executor.submit(transfer_file, src, dst, link_mode, compare, verify, move)
+                    pending[future] = (src, dst)
+                    return True
+                return False
+
+            while len(pending) < workers * PENDING_PER_WORKER and submit_next():
+                pass
+
+            # Log, Zähler und Rückmeldung nur im aufrufenden Thread
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        src, dst = pending.pop(future)
+                        submit_next()
+                        timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        try:
+                            result, size = future.result()
+                        except Exception as e:
+                            stats['failed'] += 1
+                            stats['errors'].append((src, str(e)))
+                            if log_file:
+                                log_file.write(f"{timestamp} - Fehler: {src} -> {dst}: {e}\n")
+                            if on_result:
+                                on_result(src, dst, RESULT_FAILED, str(e))
+                            continue
+
+                        stats['bytes'] += size
+                        counter, log_text = RESULT_STATS[result]
+                        stats[counter] += 1
+                        if log_file:
+                            log_file.write(f"{timestamp} - {log_text}: {src} -> {dst}\n")
+                        if on_result:
+                            on_result(src, dst, result, None)
+            except KeyboardInterrupt:
+                # Wartende Aufträge verwerfen, laufende werden noch beendet
+                for future in pending:
+                    future.cancel()
+                raise
+    finally:
+        if log_file:
+            log_file.close()
+
+    stats['seconds'] = (datetime.datetime.now() - start).total_seconds()
+    return stats
+
+
+def format_copy_stats(stats):
+    """Zusammenfassung von copy_files mit Durchsatz (MB/s und Dateien/s)."""
+    files = sum(stats[counter] for counter, _ in RESULT_STATS.values()) + stats['failed']
+    seconds = max(stats['seconds'], 1e-6)
+    lines = []
+    for counter, log_text in RESULT_STATS.values():
+        if stats[counter]:
+            lines.append(f"  - {stats[counter]} {log_text.lower()}")
+    lines.append(f"  - {stats['failed']} fehlgeschlagen")
+    lines.append(f"  - {stats['bytes'] / (1024 * 1024):.1f} MB in {stats['seconds']:.1f} s: "
+                 f"{stats['bytes'] / (1024 * 1024) / seconds:.1f} MB/s, {files / seconds:.1f} Dateien/s")
+    return "\n".join(lines)
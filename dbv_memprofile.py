@@ -0,0 +1,85 @@
+"""
+Speichermessung für die Bildverarbeitung.
+
+Erfasst nach jedem Verarbeitungsschritt den Arbeitsspeicher des Prozesses (RSS)
+und die Python-Allokationen (tracemalloc). Pillow legt die Bilddaten außerhalb
+des Python-Heaps an, diese sind daher nur im RSS sichtbar.
+"""
+
+import os
+import sys
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def get_peak_rss():
+    """Höchster RSS des Prozesses seit dem Start in Bytes (0, falls nicht ermittelbar)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS liefert Bytes, Linux KB
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def get_rss():
+    """Aktueller RSS des Prozesses in Bytes (ohne /proc: Spitzenwert)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return get_peak_rss()
+
+
+def format_bytes(size):
+    """Bytes als MB-Text"""
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+class StageProfiler:
+    """Sammelt (schritt, rss, python_aktuell, python_spitze) nach jedem Verarbeitungsschritt."""
+
+    def __init__(self):
+        self.stages = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    def mark(self, stage):
+        """Hält den Speicherstand nach einem Schritt fest; die Python-Spitze gilt seit dem letzten Schritt."""
+        current, peak = tracemalloc.get_traced_memory()
+        self.stages.append((stage, get_rss(), current, peak))
+        tracemalloc.reset_peak()
+
+
+def summarize_stages(stage_lists):
+    """
+    Fasst die Messungen vieler Bilder pro Schritt zusammen.
+
+    Args:
+        stage_lists (list): Listen von (schritt, rss, python_aktuell, python_spitze)
+
+    Returns:
+        dict: schritt -> {'count', 'rss_max', 'rss_sum', 'py_peak_max'} (in Reihenfolge des ersten Auftretens)
+    """
+    summary = {}
+    for stages in stage_lists:
+        for stage, rss, _, py_peak in stages:
+            item = summary.setdefault(stage, {'count': 0, 'rss_max': 0, 'rss_sum': 0, 'py_peak_max': 0})
+            item['count'] += 1
+            item['rss_max'] = max(item['rss_max'], rss)
+            item['rss_sum'] += rss
+            item['py_peak_max'] = max(item['py_peak_max'], py_peak)
+    return summary
+
+
+def format_stage_report(summary):
+    """Tabelle der Schritte mit mittlerem/maximalem RSS und Python-Spitze."""
+    lines = [f"  {'Schritt':<14} {'Anzahl':>7} {'RSS Mittel':>12} {'RSS Max':>12} {'Python Spitze':>14}"]
+    for stage, item in summary.items():
+        lines.append(f"  {stage:<14} {item['count']:>7} {format_bytes(item['rss_sum'] / item['count']):>12} "
+                     f"{format_bytes(item['rss_max']):>12} {format_bytes(item['py_peak_max']):>14}")
+    return "\n".join(lines)
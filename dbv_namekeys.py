@@ -0,0 +1,139 @@
+"""
+Kanonische Namensschlüssel für Suche und Bildzuordnung.
+
+Namen und Dateinamen werden auf dieselbe Form gebracht: Kleinschreibung
+(casefold, ß -> ss), deutsche Umschreibung der Umlaute (ä -> ae), Zerlegung
+nach NFKD ohne Akzente (é -> e) und Entfernen aller Trennzeichen (Leerzeichen,
+Bindestrich, Unterstrich, Punkt). "Schüßler", "Schuessler" und "SCHÜSSLER"
+ergeben so denselben Schlüssel "schuessler", "Müller-Lüdenscheidt" und
+"Mueller_Luedenscheidt" den Schlüssel "muellerluedenscheidt".
+
+Die Schlüssel von Vor- und Nachname stehen in den Spalten vorname_key und
+name_key der Tabelle anmeldungen (Wörter durch Leerzeichen getrennt), damit
+checkpic und die Suche im Web-Viewer dieselben Werte verwenden. Sie sind
+abgeleitete Daten: der Trigger für updated_at reagiert nur auf Änderungen der
+übrigen Spalten, der Abgleich lässt updated_at also unverändert.
+"""
+
+import re
+import unicodedata
+
+TABLE = 'anmeldungen'
+NAME_KEY_COLUMNS = ('vorname_key', 'name_key')
+TIMESTAMP_TRIGGER = 'update_anmeldungen_timestamp'
+# Spalten, deren Änderung den Trigger nicht auslösen darf
+TRIGGER_EXCLUDED_COLUMNS = ('id', 'created_at', 'updated_at') + NAME_KEY_COLUMNS
+
+# Nach casefold(): Umlaute wie im Deutschen umschreiben, bevor NFKD sie in Vokal + Trema zerlegt
+TRANSLITERATION = str.maketrans({
+    'ä': 'ae',
+    'ö': 'oe',
+    'ü': 'ue',
+    'æ': 'ae',
+    'œ': 'oe',
+    'ø': 'oe',
+    'ł': 'l',
+    'đ': 'd',
+    'ð': 'd',
+    'þ': 'th',
+    'ı': 'i',
+})
+# Alles außer Buchstaben und Ziffern (auch _) trennt Wörter
+SEPARATOR_PATTERN = re.compile(r'[\W_]+')
+
+
+def fold_text(text):
+    """Kleinschreibung, Umschreibung und Entfernen der Akzente; Trennzeichen bleiben erhalten."""
+    text = str(text).casefold().translate(TRANSLITERATION)
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def canonical_tokens(text):
+    """Schlüssel der einzelnen Wörter eines Textes ("Anna-Maria" -> ['anna', 'maria'])."""
+    if not text:
+        return []
+    return [token for token in SEPARATOR_PATTERN.split(fold_text(text)) if token]
+
+
+def canonical_key(text):
+    """Schlüssel eines Textes ohne Trennzeichen ("Anna-Maria Schüßler" -> 'annamariaschuessler')."""
+    return ''.join(canonical_tokens(text))
+
+
+def get_name_keys(vorname, name):
+    """
+    Schlüssel für Vor- und Nachname, wie sie in der Datenbank gespeichert werden.
+
+    Returns:
+        tuple: (vorname_key, name_key), jeweils die Wortschlüssel durch Leerzeichen getrennt
+    """
+    return ' '.join(canonical_tokens(vorname)), ' '.join(canonical_tokens(name))
+
+
+def has_name_key_columns(conn):
+    """True, wenn die Datenbank die Schlüsselspalten bereits hat (nur lesend, ohne Migration)."""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})")}
+    return all(column in columns for column in NAME_KEY_COLUMNS)
+
+
+def ensure_name_key_schema(conn):
+    """
+    Migriert ältere Datenbanken: legt die Schlüsselspalten an und beschränkt den
+    updated_at-Trigger auf die Datenspalten (AFTER UPDATE OF ...), damit das
+    Schreiben der Schlüssel updated_at nicht auf die aktuelle Zeit setzt.
+    """
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})")]
+    for column in NAME_KEY_COLUMNS:
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {column} TEXT")
+
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                       (TIMESTAMP_TRIGGER,)).fetchone()
+    if row is None or 'UPDATE OF' in ' '.join(row[0].upper().split()):
+        return
+    data_columns = ', '.join(f'"{column}"' for column in columns if column not in TRIGGER_EXCLUDED_COLUMNS)
+    # In einer Transaktion, damit die Tabelle nie ohne Trigger bleibt
+    conn.executescript(f"""
+        BEGIN;
+        DROP TRIGGER {TIMESTAMP_TRIGGER};
+        CREATE TRIGGER {TIMESTAMP_TRIGGER}
+        AFTER UPDATE OF {data_columns} ON {TABLE}
+        FOR EACH ROW
+        BEGIN
+            UPDATE {TABLE} SET updated_at = CURRENT_TIMESTAMP WHERE id = OLD.id;
+        END;
+        COMMIT;
+    """)
+
+
+def update_entry_name_keys(conn, entry_id, vorname, name):
+    """Schreibt die Schlüssel eines geänderten Eintrags (ohne commit), falls die Spalten vorhanden sind."""
+    if has_name_key_columns(conn):
+        conn.execute(f"UPDATE {TABLE} SET vorname_key = ?, name_key = ? WHERE id = ?",
+                     get_name_keys(vorname, name) + (entry_id,))
+
+
+def refresh_name_keys(conn):
+    """
+    Berechnet die Schlüssel aller Einträge und schreibt die geänderten zurück.
+
+    Namen können von mehreren Programmen geändert werden (Import, Web-Viewer,
+    db_edit), daher wird vor jeder Verwendung abgeglichen statt bei jedem Schreiben.
+    Migriert ältere Datenbanken vorher mit ensure_name_key_schema; nur aus
+    Kommandozeilenprogrammen oder beim Start des Web-Viewers aufrufen.
+
+    Returns:
+        int: Anzahl der aktualisierten Einträge
+    """
+    ensure_name_key_schema(conn)
+    updates = []
+    for entry_id, vorname, name, vorname_key, name_key in conn.execute(
+            f"SELECT id, vorname, name, vorname_key, name_key FROM {TABLE}"):
+        keys = get_name_keys(vorname, name)
+        if keys != (vorname_key, name_key):
+            updates.append(keys + (entry_id,))
+    if updates:
+        conn.executemany(f"UPDATE {TABLE} SET vorname_key = ?, name_key = ? WHERE id = ?", updates)
+    conn.commit()
+    return len(updates)
@@ -0,0 +1,303 @@
+"""
+Namenssuche in Dateinamen für checkpic.
+
+Ein Bild gehört zu einem Teilnehmer, wenn der Dateiname mit einem seiner
+Vornamen beginnt und den Nachnamen enthält. Statt jede Datei gegen jede
+Kombination aus Vor- und Nachnamen zu prüfen, werden alle Namen
+einer Gruppe einmal kompiliert: die Vornamen in einen Präfix-Baum, die
+Nachnamen in einen Aho-Corasick-Automaten. Jeder Dateiname wird danach einmal
+von vorne nach hinten gelesen und liefert alle passenden Einträge.
+
+Für Dateinamen mit Tippfehlern gibt es zusätzlich FuzzyNameMatcher, der über
+einen Löschindex (SymSpell) Namen mit Editierabstand 1-2 findet. TokenIndex
+schlägt für nicht zugeordnete Bilder die wahrscheinlichsten Einträge vor.
+"""
+
+import math
+from collections import deque
+
+# Schlüssel für die Einträge, die an einem Knoten enden (Zeichen sind immer str)
+_VALUES = None
+
+
+class PrefixTrie:
+    """Präfix-Baum: findet alle Wörter, mit denen ein Text beginnt."""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, word, value):
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+        node.setdefault(_VALUES, set()).add(value)
+
+    def match_prefixes(self, text):
+        """Werte aller eingetragenen Wörter, die Präfix von text sind."""
+        found = set(self.root.get(_VALUES, ()))
+        node = self.root
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                break
+            if _VALUES in node:
+                found |= node[_VALUES]
+        return found
+
+
+class AhoCorasick:
+    """Aho-Corasick-Automat: findet alle eingetragenen Muster, die in einem Text vorkommen."""
+
+    def __init__(self):
+        # Pro Zustand: Übergänge, Fehlerverweis, Werte der hier endenden Muster
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+        self.built = False
+
+    def add(self, pattern, value):
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(set())
+                self.goto[state][char] = next_state
+            state = next_state
+        self.output[state].add(value)
+        self.built = False
+
+    def build(self):
+        """Berechnet die Fehlerverweise (Breitensuche); danach sind die Ausgaben je Zustand vollständig."""
+        queue = deque(self.goto[0].values())
+        for state in queue:
+            self.fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                # Muster, die als Suffix enden, gehören zur Ausgabe dieses Zustands
+                self.output[next_state] |= self.output[self.fail[next_state]]
+        self.built = True
+
+    def search(self, text):
+        """Werte aller Muster, die in text vorkommen."""
+        if not self.built:
+            self.build()
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set(output[0])
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+class NameMatcher:
+    """
+    Ordnet Dateinamen den Einträgen einer Gruppe zu.
+
+    Namen und Dateinamen werden vorher mit dbv_namekeys kanonisiert.
+
+    Beispiel:
+        matcher = NameMatcher()
+        matcher.add_entry(7, ['anna', 'maria'], ['schuessler'])
+        matcher.match('mariaschuessler1')  # -> {7}
+    """
+
+    def __init__(self):
+        self.first_names = PrefixTrie()
+        self.last_names = AhoCorasick()
+
+    def add_entry(self, entry_id, first_names, last_names):
+        """
+        Trägt die Schlüssel eines Eintrags ein.
+
+        Args:
+            entry_id: Kennung, die match() zurückgibt
+            first_names (list): Vornamen, von denen einer am Anfang des Dateinamens stehen muss
+            last_names (list): Nachnamen, von denen einer im Dateinamen vorkommen muss
+        """
+        for first_name in first_names:
+            if first_name:
+                self.first_names.add(first_name, entry_id)
+        for last_name in last_names:
+            if last_name:
+                self.last_names.add(last_name, entry_id)
+
+    def match(self, file_key):
+        """Alle Einträge, deren Vorname am Anfang steht und deren Nachname im Dateinamen vorkommt."""
+        candidates = self.first_names.match_prefixes(file_key)
+        if not candidates:
+            return candidates
+        return candidates & self.last_names.search(file_key)
+
+
+def edit_distance(a, b):
+    """Editierabstand mit Vertauschung benachbarter Zeichen als ein Schritt ("jonh" -> "john" = 1)."""
+    if a == b:
+        return 0
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            cost = 0 if char_a == char_b else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def get_deletes(word, max_distance):
+    """Alle Zeichenfolgen, die durch Löschen von bis zu max_distance Zeichen entstehen (inkl. word)."""
+    deletes = {word}
+    current = {word}
+    for _ in range(max_distance):
+        current = {variant[:i] + variant[i + 1:] for variant in current for i in range(len(variant))}
+        deletes |= current
+    return deletes
+
+
+# Mindestlänge eines Namens für den jeweiligen Abstand; kurze Namen nur exakt
+FUZZY_MIN_LENGTH = {1: 4, 2: 8}
+
+
+def get_allowed_distance(word, max_distance):
+    """Größter erlaubter Abstand für einen Namen dieser Länge."""
+    return max((distance for distance, length in FUZZY_MIN_LENGTH.items()
+                if distance <= max_distance and len(word) >= length), default=0)
+
+
+class DeleteIndex:
+    """
+    Löschindex nach dem SymSpell-Verfahren.
+
+    Für jeden eingetragenen Namen werden einmal alle Löschvarianten bis zum
+    erlaubten Abstand gespeichert. Eine Suche erzeugt die Löschvarianten des
+    Suchworts und findet die Kandidaten per Hash-Zugriff; der echte Abstand
+    wird nur für diese wenigen Kandidaten berechnet.
+    """
+
+    def __init__(self, max_distance=2):
+        self.max_distance = max_distance
+        self.deletes = {}
+        self.values = {}
+
+    def add(self, word, value):
+        if word not in self.values:
+            for variant in get_deletes(word, get_allowed_distance(word, self.max_distance)):
+                self.deletes.setdefault(variant, set()).add(word)
+        self.values.setdefault(word, set()).add(value)
+
+    def lookup(self, word):
+        """Werte aller Namen, die höchstens ihren erlaubten Abstand von word entfernt sind."""
+        candidates = set()
+        for variant in get_deletes(word, self.max_distance):
+            candidates |= self.deletes.get(variant, set())
+        found = set()
+        for candidate in candidates:
+            if edit_distance(word, candidate) <= get_allowed_distance(candidate, self.max_distance):
+                found |= self.values[candidate]
+        return found
+
+
+class FuzzyNameMatcher:
+    """
+    Tippfehlertolerante Zuordnung für Dateinamen ohne exakten Treffer.
+
+    Verglichen wird wortweise: das erste Wort des Dateinamens mit den Vornamen,
+    die übrigen Wörter mit den Nachnamen ("Jonh_Doe_1" -> jonh ~ john, doe).
+    """
+
+    def __init__(self, max_distance=2):
+        self.first_names = DeleteIndex(max_distance)
+        self.last_names = DeleteIndex(max_distance)
+
+    def add_entry(self, entry_id, first_names, last_names):
+        """Trägt die Schlüssel eines Eintrags ein (wie NameMatcher.add_entry)."""
+        for first_name in first_names:
+            if first_name:
+                self.first_names.add(first_name, entry_id)
+        for last_name in last_names:
+            if last_name:
+                self.last_names.add(last_name, entry_id)
+
+    def match(self, file_tokens):
+        """Alle Einträge, deren Vorname ungefähr dem ersten und deren Nachname ungefähr einem weiteren Wort entspricht."""
+        if len(file_tokens) < 2:
+            return set()
+        candidates = self.first_names.lookup(file_tokens[0])
+        if not candidates:
+            return candidates
+        last_matches = set()
+        for token in file_tokens[1:]:
+            last_matches |= self.last_names.lookup(token)
+        return candidates & last_matches
+
+
+# Gewicht eines Wortes, das nur unscharf (per DeleteIndex) gefunden wurde
+FUZZY_TOKEN_WEIGHT = 0.5
+
+
+class TokenIndex:
+    """
+    Invertierter Index Namenswort -> Einträge.
+
+    Bewertet einen Dateinamen nach den Wörtern, die er mit den Namen der
+    Einträge gemeinsam hat; seltene Wörter (IDF) zählen mehr als häufige.
+    Mit max_distance werden Wörter ohne exakten Treffer zusätzlich über einen
+    DeleteIndex gesucht und mit FUZZY_TOKEN_WEIGHT gewichtet.
+    """
+
+    def __init__(self, max_distance=None):
+        self.postings = {}
+        self.entry_ids = set()
+        self.fuzzy = DeleteIndex(max_distance) if max_distance else None
+
+    def add_entry(self, entry_id, tokens):
+        self.entry_ids.add(entry_id)
+        for token in tokens:
+            if token:
+                self.postings.setdefault(token, set()).add(entry_id)
+                if self.fuzzy:
+                    self.fuzzy.add(token, token)
+
+    def weight(self, token):
+        return math.log(1 + len(self.entry_ids) / len(self.postings[token]))
+
+    def rank(self, file_tokens, limit=3):
+        """
+        Die besten Einträge für die Wörter eines Dateinamens.
+
+        Returns:
+            list: (Eintrags-ID, Punkte), absteigend nach Punkten, höchstens limit Einträge
+        """
+        scores = {}
+        for token in set(file_tokens):
+            if token in self.postings:
+                matches = [(token, 1.0)]
+            elif self.fuzzy:
+                matches = [(matched, FUZZY_TOKEN_WEIGHT) for matched in self.fuzzy.lookup(token)]
+            else:
+                continue
+            # Jedes Wort des Dateinamens zählt pro Eintrag höchstens einmal
+            token_scores = {}
+            for matched, factor in matches:
+                score = self.weight(matched) * factor
+                for entry_id in self.postings[matched]:
+                    token_scores[entry_id] = max(token_scores.get(entry_id, 0.0), score)
+            for entry_id, score in token_scores.items():
+                scores[entry_id] = scores.get(entry_id, 0.0) + score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
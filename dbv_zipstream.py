@@ -0,0 +1,69 @@
+"""
+ZIP-Export als Datenstrom.
+
+Baut ein ZIP-Archiv (ohne Kompression, die JPEGs sind bereits komprimiert)
+blockweise in einem Generator auf, sodass es direkt in die HTTP-Antwort
+geschrieben werden kann. Es wird nichts auf der Platte zwischengespeichert und
+der Speicherbedarf bleibt auch bei mehreren GB konstant.
+"""
+
+import zipfile
+
+ZIP_BLOCK_SIZE = 1024 * 1024
+
+
+class ZipChunkSink:
+    """Nur-Schreib-Ziel für zipfile; sammelt die geschriebenen Bytes bis zum nächsten pop()."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        """Gibt die seit dem letzten Aufruf geschriebenen Bytes zurück."""
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(files, extra_files=None):
+    """
+    Erzeugt ein ZIP-Archiv als Folge von Byte-Blöcken.
+
+    Args:
+        files (list): Liste von (quellpfad, name_im_archiv)
+        extra_files (list, optional): Liste von (name_im_archiv, text) für zusätzliche Textdateien (z.B. Log)
+
+    Yields:
+        bytes: Nächster Teil des Archivs
+    """
+    sink = ZipChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for arcname, text in extra_files or []:
+            zf.writestr(arcname, text)
+            yield sink.pop()
+
+        for src, arcname in files:
+            try:
+                zinfo = zipfile.ZipInfo.from_file(src, arcname)
+            except OSError as e:
+                print(f"Fehler beim Lesen von {src}: {e}")
+                continue
+            zinfo.compress_type = zipfile.ZIP_STORED
+
+            # Dateigröße ist in zinfo gesetzt, damit zipfile bei Bedarf ZIP64 verwendet
+            with open(src, 'rb') as f, zf.open(zinfo, 'w') as dest:
+                for block in iter(lambda: f.read(ZIP_BLOCK_SIZE), b''):
+                    dest.write(block)
+                    yield sink.pop()
+            yield sink.pop()
+
+    # Zentrales Verzeichnis
+    yield sink.pop()
+